@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Catalog query benchmark for the E-commerce API: dict scans vs the columnar mirror
+"""
+
+import argparse
+import random
+import time
+
+import ecommerce_api
+
+def load_catalog(product_count, seed):
+    """Fill the catalog with generated products and bulk load the columns"""
+    rng = random.Random(seed)
+    category_names = list(ecommerce_api.categories)
+    ecommerce_api.products.clear()
+    for i in range(product_count):
+        product_id = f'bench-{i}'
+        ecommerce_api.products[product_id] = {
+            'id': product_id,
+            'name': f'Benchmark Product {i}',
+            'description': 'Benchmark product',
+            'price': round(rng.uniform(1, 1000), 2),
+            'category': rng.choice(category_names),
+            'stock': rng.randint(0, 200),
+            'images': [],
+            'rating': round(rng.uniform(0, 5), 1),
+            'reviews': 0
+        }
+    ecommerce_api.rebuild_catalog_columns()
+
+def scan_filter(category, min_price, max_price):
+    """The per-product filter loop get_products used before the columns"""
+    matched = []
+    for product in ecommerce_api.products.values():
+        if category and product['category'] != category:
+            continue
+        if min_price is not None and product['price'] < min_price:
+            continue
+        if max_price is not None and product['price'] > max_price:
+            continue
+        matched.append(product['id'])
+    matched.sort(key=lambda product_id: ecommerce_api.products[product_id]['price'])
+    return matched
+
+def scan_breakdown(threshold):
+    """inventory_breakdown computed with the dict scan fallback"""
+    numpy = ecommerce_api.np
+    ecommerce_api.np = None
+    try:
+        return ecommerce_api.inventory_breakdown(threshold)
+    finally:
+        ecommerce_api.np = numpy
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    """Time catalog filters and inventory aggregation both ways"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=1_000_000, help='catalog size')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per query, best is reported')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if ecommerce_api.np is None:
+        parser.error('numpy is required for the columnar catalog')
+
+    start = time.perf_counter()
+    load_catalog(args.products, args.seed)
+    print(f'loaded {args.products} products in {time.perf_counter() - start:.1f}s\n')
+
+    queries = [
+        ('electronics, 100-200', ('electronics', 100, 200)),
+        ('any, 0-50', (None, 0, 50)),
+        ('books, any price', ('books', None, None)),
+    ]
+    print(f"{'query':<24}{'matches':>9}{'dict scan ms':>14}{'columnar ms':>13}{'speedup':>9}")
+    for label, filters in queries:
+        scan_time, expected = best_time(lambda: scan_filter(*filters), args.repeat)
+        column_time, result = best_time(lambda: ecommerce_api.column_filter(*filters), args.repeat)
+        if sorted(result) != sorted(expected):
+            raise SystemExit(f'{label}: columnar result differs from the dict scan')
+        print(f'{label:<24}{len(result):>9}{scan_time * 1000:>14.1f}'
+              f'{column_time * 1000:>13.1f}{scan_time / column_time:>8.1f}x')
+
+    threshold = ecommerce_api.LOW_STOCK_THRESHOLD
+    scan_time, expected = best_time(lambda: scan_breakdown(threshold), args.repeat)
+    column_time, result = best_time(lambda: ecommerce_api.inventory_breakdown(threshold), args.repeat)
+    if result != expected:
+        raise SystemExit('inventory breakdown differs from the dict scan')
+    print(f"{'inventory breakdown':<24}{len(result):>9}{scan_time * 1000:>14.1f}"
+          f'{column_time * 1000:>13.1f}{scan_time / column_time:>8.1f}x')
+
+if __name__ == '__main__':
+    main()
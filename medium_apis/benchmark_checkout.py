@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark for concurrent checkouts in the E-commerce API
+"""
+
+import argparse
+import random
+import threading
+import time
+
+import ecommerce_api
+
+def reset_catalog(product_count, stock):
+    """Replace the catalog with hot products that have limited stock"""
+    for product_id in list(ecommerce_api.products):
+        ecommerce_api.unindex_product(ecommerce_api.products.pop(product_id))
+    ecommerce_api.cart_items.clear()
+    ecommerce_api.user_carts.clear()
+    ecommerce_api.cart_totals.clear()
+    ecommerce_api.product_carts.clear()
+    ecommerce_api.orders.clear()
+
+    for i in range(product_count):
+        product = {
+            'id': f'bench-{i}',
+            'name': f'Benchmark Product {i}',
+            'description': 'Benchmark product',
+            'price': 10.0,
+            'category': 'electronics',
+            'stock': stock,
+            'images': [],
+            'rating': 0.0,
+            'reviews': 0
+        }
+        ecommerce_api.products[product['id']] = product
+        ecommerce_api.index_product(product)
+
+def worker(client, user_id, product_ids, orders_per_thread, results):
+    """Fill a cart with a few random products and check out, repeatedly"""
+    rng = random.Random(user_id)
+    placed = rejected = 0
+    for _ in range(orders_per_thread):
+        for product_id in rng.sample(product_ids, 3):
+            client.post('/api/cart/add', json={
+                'product_id': product_id,
+                'quantity': rng.randint(1, 3),
+                'user_id': user_id
+            })
+        response = client.post('/api/orders', json={
+            'user_id': user_id,
+            'shipping_address': '1 Benchmark Way'
+        })
+        if response.status_code == 201:
+            placed += 1
+        else:
+            rejected += 1
+            # Stock ran out after the cart was filled; start the next round empty
+            ecommerce_api.clear_cart(user_id)
+    results.append((placed, rejected))
+
+def run(threads, args, mode):
+    """Run one benchmark round and verify that no product was oversold"""
+    reset_catalog(args.products, args.stock)
+    product_ids = list(ecommerce_api.products)
+
+    original_place_order = ecommerce_api.place_order
+    original_clear_cart = ecommerce_api.clear_cart
+    global_lock = threading.Lock()
+
+    def slow_clear_cart(user_id):
+        # Simulated order persistence latency while the user's lock is held
+        time.sleep(args.latency_ms / 1000)
+        original_clear_cart(user_id)
+
+    def globally_locked_place_order(user_id, shipping_address):
+        with global_lock:
+            return original_place_order(user_id, shipping_address)
+
+    ecommerce_api.clear_cart = slow_clear_cart
+    if mode == 'global':
+        ecommerce_api.place_order = globally_locked_place_order
+
+    results = []
+    workers = [
+        threading.Thread(target=worker, args=(ecommerce_api.app.test_client(), f'user-{i}',
+                                              product_ids, args.orders, results))
+        for i in range(threads)
+    ]
+    start = time.perf_counter()
+    try:
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    finally:
+        ecommerce_api.place_order = original_place_order
+        ecommerce_api.clear_cart = original_clear_cart
+    elapsed = time.perf_counter() - start
+
+    # Every unit sold must come out of stock exactly once
+    sold = {}
+    for order in ecommerce_api.orders.values():
+        for item in order['items']:
+            sold[item['product_id']] = sold.get(item['product_id'], 0) + item['quantity']
+    oversells = 0
+    for product_id, product in ecommerce_api.products.items():
+        if product['stock'] < 0 or product['stock'] + sold.get(product_id, 0) != args.stock:
+            oversells += 1
+
+    placed = sum(result[0] for result in results)
+    rejected = sum(result[1] for result in results)
+    return placed, rejected, placed / elapsed, oversells
+
+def main():
+    """Compare per-product locking with a single global checkout lock"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', default='1,2,4,8,16',
+                        help='comma-separated thread counts')
+    parser.add_argument('--orders', type=int, default=50, help='orders per thread')
+    parser.add_argument('--products', type=int, default=20, help='number of hot products')
+    parser.add_argument('--stock', type=int, default=100, help='initial stock per product')
+    parser.add_argument('--latency-ms', type=float, default=2.0,
+                        help='simulated persistence latency per order')
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'threads':>8}{'placed':>8}{'rejected':>10}{'orders/s':>12}{'oversells':>11}")
+    for mode in ['fine', 'global']:
+        for threads in [int(value) for value in args.threads.split(',')]:
+            placed, rejected, throughput, oversells = run(threads, args, mode)
+            print(f"{mode:<8}{threads:>8}{placed:>8}{rejected:>10}{throughput:>12.1f}{oversells:>11}")
+
+if __name__ == '__main__':
+    main()
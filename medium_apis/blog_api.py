@@ -1,9 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import uuid
 import datetime
+import re
+import math
+import bisect
+import heapq
+import itertools
+import base64
+import json
+import hashlib
+import threading
+import time
+import sys
+import zlib
+from collections import OrderedDict
 from functools import wraps
 
 app = Flask(__name__)
+# Post bodies at least this many UTF-8 bytes long are kept zlib-compressed
+app.config['COMPRESS_POST_CONTENT'] = True
+app.config['COMPRESSION_THRESHOLD'] = 2048
 
 # In-memory storage
 posts = {}
@@ -15,12 +31,741 @@ categories = {
     'food': 'Food and cooking',
     'business': 'Business and entrepreneurship'
 }
-tags = set()
 likes = {}
 
+# Secondary indexes: field -> value -> set of post ids
+post_index = {
+    'status': {},
+    'category': {},
+    'author_id': {},
+    'tag': {},
+    'featured': {}
+}
+
+# Tag index: post_index['tag'] is reference-counted by its post sets (a tag's
+# usage is the size of its set and it is dropped with its last post). Tag names
+# are also kept sorted for paging and in a trie for autocomplete, where every
+# node caches its top tags by usage until a tag below it changes.
+sorted_tags = []
+tag_trie = {'children': {}, 'tag': None, 'top': None}
+AUTOCOMPLETE_SIZE = 10
+MAX_TAG_PAGE = 1000
+
+# (created_at, post_id) pairs in ascending order, for newest-first paging
+posts_by_time = []
+# Filter sets smaller than 1/TIME_SCAN_RATIO of all posts are sorted directly
+# instead of walking the time index
+TIME_SCAN_RATIO = 8
+
+# Full-text search index over title, content and tags
+search_index = {}   # term -> {post_id: weighted term frequency}
+search_terms = []   # sorted vocabulary for prefix lookups
+post_terms = {}     # post_id -> {term: weighted term frequency}
+post_lengths = {}   # post_id -> weighted document length
+search_stats = {'total_length': 0}
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_TERMS = 50
+
+# Comment indexes
+post_comment_ids = {}   # post_id -> comment ids in creation order
+post_root_comments = {} # post_id -> top-level comment ids in creation order
+comment_replies = {}    # comment_id -> reply ids in creation order
+MAX_THREAD_DEPTH = 10
+
+# Like indexes
+post_likers = {}        # post_id -> set of user ids
+user_liked_posts = {}   # user_id -> set of post ids
+MAX_LIKE_BATCH = 100
+
+# Compressed post bodies: post['content'] is None while the body lives here
+compressed_contents = {}        # post_id -> zlib-compressed UTF-8 body
+content_cache = OrderedDict()   # post_id -> decompressed body, LRU
+content_cache_lock = threading.Lock()
+CONTENT_CACHE_SIZE = 256
+compression_stats = {'original_bytes': 0, 'compressed_bytes': 0, 'cache_hits': 0, 'cache_misses': 0}
+
+# Related posts: MinHash signatures of each post's tag set, split into LSH
+# bands so posts with similar tags share buckets. Candidates from a post's
+# buckets are re-ranked by exact Jaccard similarity of their tags.
+lsh_buckets = {}        # (band, band signature) -> set of published post ids
+post_signatures = {}    # post_id -> MinHash signature, for every tagged post
+MINHASH_BANDS = 16
+MINHASH_ROWS = 2
+MAX_BUCKET_CANDIDATES = 32
+MAX_RELATED = 20
+
+# Trending: each like or comment adds weight * 2^((t - epoch) / half-life), so
+# older activity decays relative to newer without touching stored scores.
+# Scores are rescaled to a new epoch before the factor grows too large.
+trending_scores = {}    # post_id -> score relative to trending_state['epoch']
+trending_heap = []      # (-score, post_id), stale entries skipped lazily
+trending_state = {'epoch': time.time()}
+trending_lock = threading.Lock()
+TRENDING_HALF_LIFE = 24 * 3600
+TRENDING_LIKE_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 2.0
+TRENDING_MAX_EXPONENT = 40
+MAX_TRENDING = 50
+
+# Bulk import
+IMPORT_BATCH_SIZE = 1000
+IMPORT_CHUNK_SIZE = 64 * 1024
+
+# Listing projections (?fields= and ?view=summary)
+post_excerpts = {}  # post_id -> precomputed plain-text excerpt
+EXCERPT_LENGTH = 200
+POST_FIELDS = ['id', 'title', 'content', 'excerpt', 'author_id', 'author_name', 'category',
+               'tags', 'status', 'created_at', 'updated_at', 'read_time', 'featured']
+SUMMARY_FIELDS = ['id', 'title', 'excerpt', 'author_id', 'author_name', 'category',
+                  'tags', 'status', 'created_at', 'read_time', 'featured']
+
+# Response cache for read endpoints, invalidated by per-collection versions
+collection_versions = {'posts': 0, 'comments': 0, 'likes': 0, 'categories': 0}
+response_cache = OrderedDict()  # (path, args) -> (versions, etag, body)
+response_cache_lock = threading.Lock()
+RESPONSE_CACHE_SIZE = 1024
+
 def generate_id():
     return str(uuid.uuid4())
 
+def post_index_keys(post):
+    keys = [
+        ('status', post['status']),
+        ('category', post['category']),
+        ('author_id', post['author_id']),
+        ('featured', bool(post['featured']))
+    ]
+    keys.extend(('tag', tag) for tag in set(post['tags']))
+    return keys
+
+def index_post(post):
+    for field, value in post_index_keys(post):
+        ids = post_index[field].get(value)
+        if ids is None:
+            ids = post_index[field][value] = set()
+            if field == 'tag':
+                bisect.insort(sorted_tags, value)
+        ids.add(post['id'])
+        if field == 'tag':
+            update_tag_trie(value)
+
+def unindex_post(post):
+    for field, value in post_index_keys(post):
+        ids = post_index[field].get(value)
+        if ids is None:
+            continue
+        ids.discard(post['id'])
+        if not ids:
+            del post_index[field][value]
+            if field == 'tag':
+                del sorted_tags[bisect.bisect_left(sorted_tags, value)]
+        if field == 'tag':
+            update_tag_trie(value)
+
+def update_tag_trie(tag):
+    # Invalidates cached top lists along the tag's path and prunes the
+    # branch once the tag is no longer used
+    path = [tag_trie]
+    for char in tag:
+        path.append(path[-1]['children'].setdefault(char, {'children': {}, 'tag': None, 'top': None}))
+    for node in path:
+        node['top'] = None
+    
+    if tag in post_index['tag']:
+        path[-1]['tag'] = tag
+        return
+    path[-1]['tag'] = None
+    for depth in range(len(tag), 0, -1):
+        node = path[depth]
+        if node['children'] or node['tag']:
+            break
+        del path[depth - 1]['children'][tag[depth - 1]]
+
+def tag_usage(tag):
+    return len(post_index['tag'][tag])
+
+def top_tags(node):
+    if node['top'] is None:
+        candidates = [node['tag']] if node['tag'] else []
+        for child in node['children'].values():
+            candidates.extend(top_tags(child))
+        node['top'] = heapq.nsmallest(AUTOCOMPLETE_SIZE, candidates,
+                                      key=lambda tag: (-tag_usage(tag), tag))
+    return node['top']
+
+def find_tag_node(prefix):
+    node = tag_trie
+    for char in prefix:
+        node = node['children'].get(char)
+        if node is None:
+            return None
+    return node
+
+def find_post_ids(**filters):
+    # Intersect the matching id sets, smallest first. A single filter returns
+    # the index set itself, so callers must not modify the result.
+    id_sets = []
+    for field, value in filters.items():
+        if value is None:
+            continue
+        id_sets.append(post_index[field].get(value, set()))
+    if not id_sets:
+        return posts.keys()
+    id_sets.sort(key=len)
+    if len(id_sets) == 1:
+        return id_sets[0]
+    result = id_sets[0] & id_sets[1]
+    for ids in id_sets[2:]:
+        if not result:
+            break
+        result &= ids
+    return result
+
+def add_post_time(post):
+    bisect.insort(posts_by_time, (post['created_at'], post['id']))
+
+def remove_post_time(post):
+    key = (post['created_at'], post['id'])
+    position = bisect.bisect_left(posts_by_time, key)
+    if position < len(posts_by_time) and posts_by_time[position] == key:
+        del posts_by_time[position]
+
+def iter_posts_newest_first(post_ids, before=None):
+    # Yields posts in post_ids newest first, starting strictly below the
+    # (created_at, post_id) keyset bound `before` when given
+    if len(post_ids) * TIME_SCAN_RATIO < len(posts_by_time):
+        keys = sorted((posts[post_id]['created_at'], post_id) for post_id in post_ids)
+    else:
+        keys = posts_by_time
+    end = bisect.bisect_left(keys, tuple(before)) if before else len(keys)
+    for position in range(end - 1, -1, -1):
+        post_id = keys[position][1]
+        if post_id in post_ids:
+            yield posts[post_id]
+
+def decode_post_cursor(cursor):
+    before = decode_cursor(cursor)
+    if (isinstance(before, list) and len(before) == 2 and
+            all(isinstance(part, str) for part in before)):
+        return before
+    return None
+
+def index_counts(field):
+    return {value: len(ids) for value, ids in post_index[field].items()}
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def index_post_text(post):
+    counts = {}
+    for term in tokenize(post['title']):
+        counts[term] = counts.get(term, 0) + TITLE_WEIGHT
+    for term in tokenize(get_post_content(post)):
+        counts[term] = counts.get(term, 0) + 1
+    for tag in post['tags']:
+        for term in tokenize(tag):
+            counts[term] = counts.get(term, 0) + TAG_WEIGHT
+    
+    post_id = post['id']
+    post_terms[post_id] = counts
+    post_lengths[post_id] = sum(counts.values())
+    search_stats['total_length'] += post_lengths[post_id]
+    
+    for term, frequency in counts.items():
+        postings = search_index.get(term)
+        if postings is None:
+            postings = search_index[term] = {}
+            bisect.insort(search_terms, term)
+        postings[post_id] = frequency
+
+def unindex_post_text(post_id):
+    counts = post_terms.pop(post_id, None)
+    if counts is None:
+        return
+    search_stats['total_length'] -= post_lengths.pop(post_id)
+    
+    for term in counts:
+        postings = search_index[term]
+        del postings[post_id]
+        if not postings:
+            del search_index[term]
+            del search_terms[bisect.bisect_left(search_terms, term)]
+
+def expand_prefix(prefix):
+    # Indexed terms starting with prefix; an exact match always sorts first
+    expanded = []
+    position = bisect.bisect_left(search_terms, prefix)
+    while (position < len(search_terms) and len(expanded) < MAX_PREFIX_TERMS and
+           search_terms[position].startswith(prefix)):
+        expanded.append(search_terms[position])
+        position += 1
+    return expanded
+
+def match_posts(query):
+    # BM25 scores for posts containing every query term (as a word prefix)
+    query_terms = []
+    for prefix in dict.fromkeys(tokenize(query)):
+        expanded = expand_prefix(prefix)
+        matched = set()
+        for term in expanded:
+            matched.update(search_index[term])
+        if not matched:
+            return {}
+        query_terms.append((expanded, matched))
+    if not query_terms:
+        return {}
+    
+    query_terms.sort(key=lambda item: len(item[1]))
+    candidates = set(query_terms[0][1])
+    for _, matched in query_terms[1:]:
+        candidates &= matched
+    
+    doc_count = len(post_terms)
+    avg_length = search_stats['total_length'] / doc_count
+    scores = dict.fromkeys(candidates, 0.0)
+    
+    for expanded, _ in query_terms:
+        for term in expanded:
+            postings = search_index[term]
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            if len(postings) < len(candidates):
+                pairs = ((post_id, freq) for post_id, freq in postings.items() if post_id in scores)
+            else:
+                pairs = ((post_id, postings[post_id]) for post_id in candidates if post_id in postings)
+            for post_id, freq in pairs:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * post_lengths[post_id] / avg_length)
+                scores[post_id] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+    
+    return scores
+
+def encode_cursor(value):
+    raw = json.dumps(value, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    # Returns None for malformed cursors
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+
+def build_comment_thread(comment_id, depth):
+    comment = dict(comments[comment_id])
+    reply_ids = comment_replies.get(comment_id, [])
+    comment['reply_count'] = len(reply_ids)
+    if depth > 1:
+        comment['replies'] = [build_comment_thread(reply_id, depth - 1) for reply_id in reply_ids]
+    else:
+        comment['replies'] = []
+    comment['has_more_replies'] = bool(reply_ids) and depth <= 1
+    return comment
+
+def set_post_content(post):
+    # Call after assigning a new body to post['content']
+    drop_post_content(post['id'])
+    content = post['content']
+    if not app.config['COMPRESS_POST_CONTENT']:
+        return
+    encoded = content.encode('utf-8')
+    if len(encoded) < app.config['COMPRESSION_THRESHOLD']:
+        return
+    compressed = zlib.compress(encoded)
+    compressed_contents[post['id']] = compressed
+    compression_stats['original_bytes'] += sys.getsizeof(content)
+    compression_stats['compressed_bytes'] += sys.getsizeof(compressed)
+    post['content'] = None
+
+def drop_post_content(post_id):
+    compressed = compressed_contents.pop(post_id, None)
+    if compressed is None:
+        return
+    with content_cache_lock:
+        content = content_cache.pop(post_id, None)
+    if content is None:
+        content = zlib.decompress(compressed).decode('utf-8')
+    compression_stats['original_bytes'] -= sys.getsizeof(content)
+    compression_stats['compressed_bytes'] -= sys.getsizeof(compressed)
+
+def get_post_content(post):
+    if post['content'] is not None:
+        return post['content']
+    post_id = post['id']
+    with content_cache_lock:
+        content = content_cache.get(post_id)
+        if content is not None:
+            content_cache.move_to_end(post_id)
+            compression_stats['cache_hits'] += 1
+            return content
+        compression_stats['cache_misses'] += 1
+    content = zlib.decompress(compressed_contents[post_id]).decode('utf-8')
+    with content_cache_lock:
+        content_cache[post_id] = content
+        while len(content_cache) > CONTENT_CACHE_SIZE:
+            content_cache.popitem(last=False)
+    return content
+
+def materialize_post(post):
+    if post['content'] is not None:
+        return post
+    return dict(post, content=get_post_content(post))
+
+def make_excerpt(content):
+    if len(content) <= EXCERPT_LENGTH:
+        return content
+    cut = content.rfind(' ', 0, EXCERPT_LENGTH)
+    return content[:cut if cut > 0 else EXCERPT_LENGTH].rstrip() + '...'
+
+def get_post_projection():
+    # Returns (fields, error); fields is None for the full post
+    fields = request.args.get('fields')
+    view = request.args.get('view', 'full')
+    if fields:
+        selected = ['id']
+        for field in fields.split(','):
+            field = field.strip()
+            if not field or field in selected:
+                continue
+            if field not in POST_FIELDS:
+                return None, f'Invalid field: {field}'
+            selected.append(field)
+        return selected, None
+    if view == 'summary':
+        return SUMMARY_FIELDS, None
+    if view != 'full':
+        return None, 'Invalid view'
+    return None, None
+
+def project_posts(post_list, fields):
+    if fields is None:
+        return [materialize_post(post) for post in post_list]
+    projected = []
+    for post in post_list:
+        item = {field: post[field] for field in fields if field not in ('excerpt', 'content')}
+        if 'excerpt' in fields:
+            item['excerpt'] = post_excerpts[post['id']]
+        if 'content' in fields:
+            item['content'] = get_post_content(post)
+        projected.append(item)
+    return projected
+
+def post_data_error(data):
+    required_fields = ['title', 'content', 'author_id', 'author_name', 'category']
+    for field in required_fields:
+        if field not in data:
+            return f'Missing required field: {field}'
+    
+    # Status, author and category are index keys
+    if not isinstance(data['author_id'], str) or not isinstance(data.get('status', 'draft'), str):
+        return 'Author ID and status must be strings'
+    if not isinstance(data['category'], str) or data['category'] not in categories:
+        return 'Invalid category'
+    
+    if not isinstance(data['content'], str) or not isinstance(data['title'], str):
+        return 'Title and content must be strings'
+    return tags_error(data.get('tags', []))
+
+def tags_error(post_tags):
+    if not isinstance(post_tags, list) or not all(isinstance(tag, str) for tag in post_tags):
+        return 'Tags must be a list of strings'
+    return None
+
+def build_post(data, post_id, created_at):
+    return {
+        'id': post_id,
+        'title': data['title'],
+        'content': data['content'],
+        'author_id': data['author_id'],
+        'author_name': data['author_name'],
+        'category': data['category'],
+        'tags': data.get('tags', []),
+        'status': data.get('status', 'draft'),
+        'created_at': created_at,
+        'updated_at': created_at,
+        'read_time': len(data['content'].split()) // 200 + 1,  # Rough estimate
+        'featured': data.get('featured', False)
+    }
+
+def store_post(post, index_time=True):
+    # Adds a post to storage and every index; bulk loaders skip the time
+    # index and merge it once per batch
+    posts[post['id']] = post
+    index_post(post)
+    index_post_text(post)
+    if index_time:
+        add_post_time(post)
+    post_excerpts[post['id']] = make_excerpt(post['content'])
+    set_post_content(post)
+    index_post_similarity(post)
+
+def store_comment(comment):
+    comment_id = comment['id']
+    post_id = comment['post_id']
+    comments[comment_id] = comment
+    post_comment_ids.setdefault(post_id, []).append(comment_id)
+    if comment['parent_id']:
+        comment_replies.setdefault(comment['parent_id'], []).append(comment_id)
+    else:
+        post_root_comments.setdefault(post_id, []).append(comment_id)
+    add_trending_activity(post_id, TRENDING_COMMENT_WEIGHT, parse_timestamp(comment['created_at']))
+
+def minhash_signature(post_tags):
+    return [min(hash((seed, tag)) for tag in post_tags)
+            for seed in range(MINHASH_BANDS * MINHASH_ROWS)]
+
+def lsh_band_keys(signature):
+    return [(band, tuple(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]))
+            for band in range(MINHASH_BANDS)]
+
+def index_post_similarity(post):
+    post_tags = set(post['tags'])
+    if not post_tags:
+        return
+    signature = post_signatures[post['id']] = minhash_signature(post_tags)
+    # Only published posts can be related results, so only they are bucketed
+    if post['status'] != 'published':
+        return
+    for key in lsh_band_keys(signature):
+        lsh_buckets.setdefault(key, set()).add(post['id'])
+
+def unindex_post_similarity(post_id):
+    signature = post_signatures.pop(post_id, None)
+    if signature is None:
+        return
+    for key in lsh_band_keys(signature):
+        bucket = lsh_buckets.get(key)
+        if bucket is None:
+            continue
+        bucket.discard(post_id)
+        if not bucket:
+            del lsh_buckets[key]
+
+def find_related_posts(post, limit):
+    # Returns [(post_id, jaccard)] for the most similar published posts.
+    # Buckets hold only published posts, and each contributes a bounded
+    # number of candidates besides the post itself, which keeps lookups cheap
+    # even when many posts share the same tags.
+    signature = post_signatures.get(post['id'])
+    if signature is None:
+        return []
+    post_tags = set(post['tags'])
+    candidates = set()
+    for key in lsh_band_keys(signature):
+        others = (candidate_id for candidate_id in lsh_buckets.get(key, ())
+                  if candidate_id != post['id'])
+        candidates.update(itertools.islice(others, MAX_BUCKET_CANDIDATES))
+    
+    scored = []
+    for candidate_id in candidates:
+        candidate = posts[candidate_id]
+        candidate_tags = set(candidate['tags'])
+        score = len(post_tags & candidate_tags) / len(post_tags | candidate_tags)
+        scored.append((score, candidate['created_at'], candidate_id))
+    
+    return [(post_id, score) for score, _, post_id in heapq.nlargest(limit, scored)]
+
+def parse_timestamp(value):
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+def normalize_timestamp(value):
+    # Imported dates are stored as naive local isoformat, like create_post,
+    # so the string-ordered time index and cursors compare them correctly
+    if not isinstance(value, str):
+        raise TypeError('Timestamp must be a string')
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+def add_trending_activity(post_id, weight, timestamp):
+    # Activity is never counted as newer than now, so the epoch cannot move
+    # past the current time
+    timestamp = min(timestamp, time.time())
+    with trending_lock:
+        exponent = (timestamp - trending_state['epoch']) / TRENDING_HALF_LIFE
+        if exponent > TRENDING_MAX_EXPONENT:
+            renormalize_trending(timestamp)
+            exponent = 0
+        score = trending_scores.get(post_id, 0.0) + weight * 2 ** exponent
+        if score <= 1e-9:
+            trending_scores.pop(post_id, None)
+            return
+        trending_scores[post_id] = score
+        heapq.heappush(trending_heap, (-score, post_id))
+        if len(trending_heap) > 2 * len(trending_scores) + 64:
+            rebuild_trending_heap()
+
+def renormalize_trending(new_epoch):
+    # Caller holds trending_lock
+    scale = 2 ** ((trending_state['epoch'] - new_epoch) / TRENDING_HALF_LIFE)
+    for post_id in trending_scores:
+        trending_scores[post_id] *= scale
+    trending_state['epoch'] = new_epoch
+    rebuild_trending_heap()
+
+def rebuild_trending_heap():
+    # Caller holds trending_lock; drops stale heap entries
+    trending_heap[:] = [(-score, post_id) for post_id, score in trending_scores.items()]
+    heapq.heapify(trending_heap)
+
+def remove_trending(post_id):
+    with trending_lock:
+        trending_scores.pop(post_id, None)
+
+def top_trending(limit):
+    # Pops valid entries until `limit` published posts are found, then pushes
+    # them back, so a read costs O(k log n) plus any stale entries skipped
+    with trending_lock:
+        found = []
+        popped = []
+        while trending_heap and len(found) < limit:
+            entry = heapq.heappop(trending_heap)
+            score = trending_scores.get(entry[1])
+            if score is None or score != -entry[0]:
+                continue
+            popped.append(entry)
+            if posts[entry[1]]['status'] == 'published':
+                found.append((entry[1], score))
+        for entry in popped:
+            heapq.heappush(trending_heap, entry)
+        decay = 2 ** ((trending_state['epoch'] - time.time()) / TRENDING_HALF_LIFE)
+    return [(post_id, score * decay) for post_id, score in found]
+
+def iter_stream_lines(stream):
+    # Reads fixed-size chunks so the body is never buffered whole
+    remainder = b''
+    while True:
+        chunk = stream.read(IMPORT_CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (remainder + chunk).split(b'\n')
+        remainder = lines.pop()
+        yield from lines
+    if remainder:
+        yield remainder
+
+def parse_import_line(line, batch_posts, batch_comments, now):
+    # Validates one NDJSON record and stages it in the current batch.
+    # Returns the per-line result.
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return {'status': 'error', 'error': 'Invalid JSON'}
+    if not isinstance(record, dict):
+        return {'status': 'error', 'error': 'Expected a JSON object'}
+    
+    record_type = record.get('type', 'post')
+    record_id = record.get('id') or generate_id()
+    if not isinstance(record_id, str):
+        return {'status': 'error', 'error': 'ID must be a string'}
+    try:
+        created_at = normalize_timestamp(record.get('created_at') or now)
+        if parse_timestamp(created_at) > time.time():
+            return {'status': 'error', 'error': 'created_at is in the future'}
+    except (TypeError, ValueError):
+        return {'status': 'error', 'error': 'Invalid created_at'}
+    
+    if record_type == 'post':
+        error = post_data_error(record)
+        if error:
+            return {'status': 'error', 'error': error}
+        if record_id in posts or record_id in batch_posts:
+            return {'status': 'error', 'error': 'Duplicate post ID'}
+        batch_posts[record_id] = build_post(record, record_id, created_at)
+    
+    elif record_type == 'comment':
+        post_id = record.get('post_id')
+        if not isinstance(post_id, str):
+            return {'status': 'error', 'error': 'post_id must be a string'}
+        if post_id not in posts and post_id not in batch_posts:
+            return {'status': 'error', 'error': 'Post not found'}
+        if not all([record.get('content'), record.get('author_id'), record.get('author_name')]):
+            return {'status': 'error', 'error': 'Content, author_id, and author_name required'}
+        if record_id in comments or record_id in batch_comments:
+            return {'status': 'error', 'error': 'Duplicate comment ID'}
+        parent_id = record.get('parent_id')
+        if parent_id is not None and not isinstance(parent_id, str):
+            return {'status': 'error', 'error': 'parent_id must be a string or null'}
+        parent = comments.get(parent_id) or batch_comments.get(parent_id)
+        if parent_id and (parent is None or parent['post_id'] != post_id):
+            return {'status': 'error', 'error': 'Invalid parent comment'}
+        batch_comments[record_id] = {
+            'id': record_id,
+            'post_id': post_id,
+            'content': record['content'],
+            'author_id': record['author_id'],
+            'author_name': record['author_name'],
+            'created_at': created_at,
+            'parent_id': parent_id
+        }
+    
+    else:
+        return {'status': 'error', 'error': 'Invalid record type'}
+    
+    return {'status': 'created', 'type': record_type, 'id': record_id}
+
+def flush_import_batch(batch_posts, batch_comments):
+    for post in batch_posts.values():
+        store_post(post, index_time=False)
+    # Merge the batch into the time index with one sort instead of n inserts
+    posts_by_time.extend((post['created_at'], post['id']) for post in batch_posts.values())
+    posts_by_time.sort()
+    for comment in batch_comments.values():
+        store_comment(comment)
+    bump_version('posts', 'comments')
+    batch_posts.clear()
+    batch_comments.clear()
+
+def bump_version(*collections):
+    with response_cache_lock:
+        for collection in collections:
+            collection_versions[collection] += 1
+
+def cached_response(*collections):
+    # Caches successful JSON responses until one of the collections changes,
+    # and answers matching If-None-Match requests with 304
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            with response_cache_lock:
+                versions = tuple(collection_versions[c] for c in collections)
+                entry = response_cache.get(key)
+                if entry and entry[0] == versions:
+                    response_cache.move_to_end(key)
+                else:
+                    entry = None
+            
+            if entry is None:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()
+                entry = (versions, etag, body)
+                with response_cache_lock:
+                    response_cache[key] = entry
+                    response_cache.move_to_end(key)
+                    while len(response_cache) > RESPONSE_CACHE_SIZE:
+                        response_cache.popitem(last=False)
+            
+            etag, body = entry[1], entry[2]
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+            else:
+                response = app.response_class(body, mimetype='application/json')
+            response.set_etag(etag)
+            return response
+        return decorated
+    return decorator
+
 # Sample posts
 sample_posts = [
     {
@@ -54,11 +799,11 @@ sample_posts = [
 ]
 
 for post in sample_posts:
-    posts[post['id']] = post
-    tags.update(post['tags'])
+    store_post(post)
 
 # 1. Get All Posts
 @app.route('/api/posts', methods=['GET'])
+@cached_response('posts')
 def get_posts():
     category = request.args.get('category')
     author_id = request.args.get('author_id')
@@ -66,62 +811,64 @@ def get_posts():
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
     search = request.args.get('search', '').lower()
+    cursor = request.args.get('cursor')
+    if page < 1 or limit < 1:
+        return jsonify({'error': 'Page and limit must be positive'}), 400
+    fields, error = get_post_projection()
+    if error:
+        return jsonify({'error': error}), 400
     
-    filtered_posts = []
+    # Status, category and author filters
+    post_ids = find_post_ids(status=status, category=category or None,
+                             author_id=author_id or None)
     
-    for post in posts.values():
-        # Status filter
-        if post['status'] != status:
-            continue
-        
-        # Category filter
-        if category and post['category'] != category:
-            continue
-        
-        # Author filter
-        if author_id and post['author_id'] != author_id:
-            continue
-        
-        # Search filter
-        if search and (search not in post['title'].lower() and 
-                      search not in post['content'].lower()):
-            continue
-        
-        filtered_posts.append(post)
+    # Search filter
+    if search:
+        post_ids = match_posts(search).keys() & post_ids
     
-    # Sort by created_at (newest first)
-    filtered_posts.sort(key=lambda x: x['created_at'], reverse=True)
-    
-    # Pagination
+    # Pagination: keyset cursor when given, page offset otherwise
+    before = None
     start = (page - 1) * limit
-    end = start + limit
-    paginated_posts = filtered_posts[start:end]
+    if cursor:
+        before = decode_post_cursor(cursor)
+        if before is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        start = 0
+    
+    # Walk the created_at index newest first
+    ordered_posts = iter_posts_newest_first(post_ids, before)
+    paginated_posts = list(itertools.islice(ordered_posts, start, start + limit))
+    
+    next_cursor = None
+    if paginated_posts and next(ordered_posts, None) is not None:
+        last = paginated_posts[-1]
+        next_cursor = encode_cursor([last['created_at'], last['id']])
     
     return jsonify({
-        'posts': paginated_posts,
-        'total': len(filtered_posts),
+        'posts': project_posts(paginated_posts, fields),
+        'total': len(post_ids),
         'page': page,
         'limit': limit,
-        'pages': (len(filtered_posts) + limit - 1) // limit
+        'pages': (len(post_ids) + limit - 1) // limit,
+        'next_cursor': next_cursor
     })
 
 # 2. Get Single Post
 @app.route('/api/posts/<post_id>', methods=['GET'])
+@cached_response('posts', 'comments', 'likes')
 def get_post(post_id):
     post = posts.get(post_id)
     if not post:
         return jsonify({'error': 'Post not found'}), 404
     
     # Get comments for this post
-    post_comments = [comment for comment in comments.values() 
-                    if comment['post_id'] == post_id]
+    post_comments = [comments[comment_id] for comment_id in post_comment_ids.get(post_id, [])]
     
     # Get like count
-    like_count = len([like for like in likes.values() 
-                     if like['post_id'] == post_id])
+    like_count = len(post_likers.get(post_id, ()))
     
     return jsonify({
-        'post': post,
+        'post': materialize_post(post),
         'comments': post_comments,
         'like_count': like_count
     })
@@ -133,36 +880,17 @@ def create_post():
     if not data:
         return jsonify({'error': 'No data provided'}), 400
     
-    required_fields = ['title', 'content', 'author_id', 'author_name', 'category']
-    for field in required_fields:
-        if field not in data:
-            return jsonify({'error': f'Missing required field: {field}'}), 400
-    
-    if data['category'] not in categories:
-        return jsonify({'error': 'Invalid category'}), 400
-    
-    post_id = generate_id()
-    post = {
-        'id': post_id,
-        'title': data['title'],
-        'content': data['content'],
-        'author_id': data['author_id'],
-        'author_name': data['author_name'],
-        'category': data['category'],
-        'tags': data.get('tags', []),
-        'status': data.get('status', 'draft'),
-        'created_at': datetime.datetime.now().isoformat(),
-        'updated_at': datetime.datetime.now().isoformat(),
-        'read_time': len(data['content'].split()) // 200 + 1,  # Rough estimate
-        'featured': data.get('featured', False)
-    }
+    error = post_data_error(data)
+    if error:
+        return jsonify({'error': error}), 400
     
-    posts[post_id] = post
-    tags.update(post['tags'])
+    post = build_post(data, generate_id(), datetime.datetime.now().isoformat())
+    store_post(post)
+    bump_version('posts')
     
     return jsonify({
         'message': 'Post created successfully',
-        'post': post
+        'post': materialize_post(post)
     }), 201
 
 # 4. Update Post
@@ -176,22 +904,45 @@ def update_post(post_id):
     if not post:
         return jsonify({'error': 'Post not found'}), 404
     
+    # Validate everything before the post leaves the indexes
+    if 'category' in data and (not isinstance(data['category'], str) or
+                               data['category'] not in categories):
+        return jsonify({'error': 'Invalid category'}), 400
+    if 'tags' in data and tags_error(data['tags']):
+        return jsonify({'error': tags_error(data['tags'])}), 400
+    if 'content' in data and not isinstance(data['content'], str):
+        return jsonify({'error': 'Content must be a string'}), 400
+    if 'title' in data and not isinstance(data['title'], str):
+        return jsonify({'error': 'Title must be a string'}), 400
+    if 'status' in data and not isinstance(data['status'], str):
+        return jsonify({'error': 'Status must be a string'}), 400
+    
     # Update fields
+    unindex_post(post)
     for field in ['title', 'content', 'category', 'tags', 'status', 'featured']:
         if field in data:
-            if field == 'category' and data[field] not in categories:
-                return jsonify({'error': 'Invalid category'}), 400
             post[field] = data[field]
+    index_post(post)
+    
+    if any(field in data for field in ['title', 'content', 'tags']):
+        unindex_post_text(post_id)
+        index_post_text(post)
+    if 'content' in data:
+        post_excerpts[post_id] = make_excerpt(post['content'])
+        set_post_content(post)
+    if 'tags' in data or 'status' in data:
+        unindex_post_similarity(post_id)
+        index_post_similarity(post)
     
     post['updated_at'] = datetime.datetime.now().isoformat()
     if 'content' in data:
         post['read_time'] = len(data['content'].split()) // 200 + 1
     
-    tags.update(post['tags'])
+    bump_version('posts')
     
     return jsonify({
         'message': 'Post updated successfully',
-        'post': post
+        'post': materialize_post(post)
     })
 
 # 5. Delete Post
@@ -201,18 +952,28 @@ def delete_post(post_id):
         return jsonify({'error': 'Post not found'}), 404
     
     # Delete associated comments
-    comments_to_delete = [comment_id for comment_id, comment in comments.items() 
-                         if comment['post_id'] == post_id]
-    for comment_id in comments_to_delete:
+    for comment_id in post_comment_ids.pop(post_id, []):
         del comments[comment_id]
+        comment_replies.pop(comment_id, None)
+    post_root_comments.pop(post_id, None)
     
     # Delete associated likes
-    likes_to_delete = [like_id for like_id, like in likes.items() 
-                      if like['post_id'] == post_id]
-    for like_id in likes_to_delete:
-        del likes[like_id]
+    for user_id in post_likers.pop(post_id, set()):
+        del likes[f"{user_id}_{post_id}"]
+        liked_posts = user_liked_posts[user_id]
+        liked_posts.discard(post_id)
+        if not liked_posts:
+            del user_liked_posts[user_id]
     
+    unindex_post(posts[post_id])
+    unindex_post_text(post_id)
+    remove_post_time(posts[post_id])
+    post_excerpts.pop(post_id, None)
+    drop_post_content(post_id)
+    unindex_post_similarity(post_id)
+    remove_trending(post_id)
     del posts[post_id]
+    bump_version('posts', 'comments', 'likes')
     return jsonify({'message': 'Post deleted successfully'})
 
 # 6. Add Comment
@@ -232,18 +993,24 @@ def add_comment(post_id):
     if not all([content, author_id, author_name]):
         return jsonify({'error': 'Content, author_id, and author_name required'}), 400
     
-    comment_id = generate_id()
+    parent_id = data.get('parent_id')
+    if parent_id is not None and not isinstance(parent_id, str):
+        return jsonify({'error': 'parent_id must be a string or null'}), 400
+    if parent_id and (parent_id not in comments or comments[parent_id]['post_id'] != post_id):
+        return jsonify({'error': 'Invalid parent comment'}), 400
+    
     comment = {
-        'id': comment_id,
+        'id': generate_id(),
         'post_id': post_id,
         'content': content,
         'author_id': author_id,
         'author_name': author_name,
         'created_at': datetime.datetime.now().isoformat(),
-        'parent_id': data.get('parent_id')  # For nested comments
+        'parent_id': parent_id  # For nested comments
     }
     
-    comments[comment_id] = comment
+    store_comment(comment)
+    bump_version('comments')
     
     return jsonify({
         'message': 'Comment added successfully',
@@ -256,11 +1023,8 @@ def get_comments(post_id):
     if post_id not in posts:
         return jsonify({'error': 'Post not found'}), 404
     
-    post_comments = [comment for comment in comments.values() 
-                    if comment['post_id'] == post_id]
-    
-    # Sort by created_at (newest first)
-    post_comments.sort(key=lambda x: x['created_at'], reverse=True)
+    # Newest first
+    post_comments = [comments[comment_id] for comment_id in reversed(post_comment_ids.get(post_id, []))]
     
     return jsonify({'comments': post_comments})
 
@@ -281,7 +1045,14 @@ def toggle_like(post_id):
     like_key = f"{user_id}_{post_id}"
     
     if like_key in likes:
+        add_trending_activity(post_id, -TRENDING_LIKE_WEIGHT, parse_timestamp(likes[like_key]['created_at']))
         del likes[like_key]
+        post_likers[post_id].discard(user_id)
+        user_liked_posts[user_id].discard(post_id)
+        if not post_likers[post_id]:
+            del post_likers[post_id]
+        if not user_liked_posts[user_id]:
+            del user_liked_posts[user_id]
         action = 'unliked'
     else:
         likes[like_key] = {
@@ -289,10 +1060,13 @@ def toggle_like(post_id):
             'post_id': post_id,
             'created_at': datetime.datetime.now().isoformat()
         }
+        post_likers.setdefault(post_id, set()).add(user_id)
+        user_liked_posts.setdefault(user_id, set()).add(post_id)
+        add_trending_activity(post_id, TRENDING_LIKE_WEIGHT, time.time())
         action = 'liked'
+    bump_version('likes')
     
-    like_count = len([like for like in likes.values() 
-                     if like['post_id'] == post_id])
+    like_count = len(post_likers.get(post_id, ()))
     
     return jsonify({
         'message': f'Post {action}',
@@ -302,23 +1076,51 @@ def toggle_like(post_id):
 
 # 9. Get Categories
 @app.route('/api/categories', methods=['GET'])
+@cached_response('categories')
 def get_categories():
     return jsonify({'categories': categories})
 
 # 10. Get Tags
 @app.route('/api/tags', methods=['GET'])
+@cached_response('posts')
 def get_tags():
-    return jsonify({'tags': list(tags)})
+    prefix = request.args.get('prefix', '')
+    page = request.args.get('page', 1, type=int)
+    limit = min(request.args.get('limit', 100, type=int), MAX_TAG_PAGE)
+    if page < 1 or limit < 1:
+        return jsonify({'error': 'Page and limit must be positive'}), 400
+    
+    # Alphabetical range of tags starting with prefix
+    first = bisect.bisect_left(sorted_tags, prefix)
+    if prefix:
+        last = bisect.bisect_left(sorted_tags, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    else:
+        last = len(sorted_tags)
+    
+    start = first + (page - 1) * limit
+    page_tags = sorted_tags[start:min(start + limit, last)]
+    
+    return jsonify({
+        'tags': page_tags,
+        'usage': {tag: tag_usage(tag) for tag in page_tags},
+        'total': last - first,
+        'page': page,
+        'limit': limit,
+        'pages': (last - first + limit - 1) // limit
+    })
 
 # 11. Get Posts by Tag
 @app.route('/api/tags/<tag>', methods=['GET'])
 def get_posts_by_tag(tag):
-    tagged_posts = [post for post in posts.values() 
-                   if tag in post['tags'] and post['status'] == 'published']
+    fields, error = get_post_projection()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    tagged_posts = list(iter_posts_newest_first(find_post_ids(tag=tag, status='published')))
     
     return jsonify({
         'tag': tag,
-        'posts': tagged_posts,
+        'posts': project_posts(tagged_posts, fields),
         'count': len(tagged_posts)
     })
 
@@ -326,62 +1128,250 @@ def get_posts_by_tag(tag):
 @app.route('/api/search', methods=['GET'])
 def search_posts():
     query = request.args.get('q', '').lower()
+    page = request.args.get('page', 1, type=int)
+    limit = request.args.get('limit', 10, type=int)
     if not query:
         return jsonify({'error': 'Search query required'}), 400
+    if page < 1 or limit < 1:
+        return jsonify({'error': 'Page and limit must be positive'}), 400
+    fields, error = get_post_projection()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    scores = match_posts(query)
     
-    results = []
-    for post in posts.values():
-        if (query in post['title'].lower() or 
-            query in post['content'].lower() or
-            any(query in tag.lower() for tag in post['tags'])):
-            results.append(post)
+    # Rank by relevance, only ordering as far as the requested page
+    start = (page - 1) * limit
+    ranked = heapq.nlargest(start + limit, scores.items(), key=lambda item: item[1])
+    results = [posts[post_id] for post_id, _ in ranked[start:]]
     
     return jsonify({
         'query': query,
-        'results': results,
-        'count': len(results)
+        'results': project_posts(results, fields),
+        'count': len(scores),
+        'page': page,
+        'limit': limit,
+        'pages': (len(scores) + limit - 1) // limit
     })
 
 # 13. Get Featured Posts
 @app.route('/api/posts/featured', methods=['GET'])
 def get_featured_posts():
-    featured_posts = [post for post in posts.values() 
-                     if post['featured'] and post['status'] == 'published']
+    fields, error = get_post_projection()
+    if error:
+        return jsonify({'error': error}), 400
     
-    return jsonify({'featured_posts': featured_posts})
+    featured_posts = list(iter_posts_newest_first(find_post_ids(featured=True, status='published')))
+    
+    return jsonify({'featured_posts': project_posts(featured_posts, fields)})
 
 # 14. Get Author Posts
 @app.route('/api/authors/<author_id>/posts', methods=['GET'])
 def get_author_posts(author_id):
-    author_posts = [post for post in posts.values() 
-                   if post['author_id'] == author_id and post['status'] == 'published']
+    fields, error = get_post_projection()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    author_posts = list(iter_posts_newest_first(find_post_ids(author_id=author_id, status='published')))
     
     return jsonify({
         'author_id': author_id,
-        'posts': author_posts,
+        'posts': project_posts(author_posts, fields),
         'count': len(author_posts)
     })
 
 # 15. Get Blog Stats
 @app.route('/api/stats', methods=['GET'])
 def get_blog_stats():
-    total_posts = len(posts)
-    published_posts = len([p for p in posts.values() if p['status'] == 'published'])
-    total_comments = len(comments)
-    total_likes = len(likes)
+    include = set(request.args.get('include', '').split(','))
+    
+    # Counts come straight from the secondary indexes kept by the write paths
+    stats = {
+        'total_posts': len(posts),
+        'published_posts': len(post_index['status'].get('published', ())),
+        'total_comments': len(comments),
+        'total_likes': len(likes),
+        'statuses': index_counts('status'),
+        'categories': index_counts('category'),
+        'tags': len(post_index['tag'])
+    }
+    
+    # Per-author and per-tag breakdowns can be large, so they are opt-in
+    if 'authors' in include:
+        stats['authors'] = index_counts('author_id')
+    if 'tags' in include:
+        stats['tag_counts'] = index_counts('tag')
+    
+    return jsonify(stats)
+
+# 16. Get Threaded Comments for Post
+@app.route('/api/posts/<post_id>/comments/thread', methods=['GET'])
+def get_comment_thread(post_id):
+    if post_id not in posts:
+        return jsonify({'error': 'Post not found'}), 404
+    
+    limit = request.args.get('limit', 10, type=int)
+    depth = request.args.get('depth', 3, type=int)
+    cursor = request.args.get('cursor')
+    if limit < 1 or depth < 1:
+        return jsonify({'error': 'Limit and depth must be positive'}), 400
+    depth = min(depth, MAX_THREAD_DEPTH)
+    
+    # Root comments are append-only, so a position cursor stays stable
+    # while new comments arrive; pages walk from newest to oldest
+    root_ids = post_root_comments.get(post_id, [])
+    if cursor:
+        end = decode_cursor(cursor)
+        if not isinstance(end, int) or not 0 <= end <= len(root_ids):
+            return jsonify({'error': 'Invalid cursor'}), 400
+    else:
+        end = len(root_ids)
+    start = max(end - limit, 0)
+    
+    threads = [build_comment_thread(comment_id, depth) for comment_id in reversed(root_ids[start:end])]
+    
+    return jsonify({
+        'comments': threads,
+        'total_comments': len(post_comment_ids.get(post_id, [])),
+        'limit': limit,
+        'depth': depth,
+        'next_cursor': encode_cursor(start) if start > 0 else None
+    })
+
+# 17. Get Likes for a Batch of Posts
+@app.route('/api/posts/likes', methods=['GET'])
+def get_post_likes():
+    post_ids = [post_id for post_id in request.args.get('ids', '').split(',') if post_id]
+    user_id = request.args.get('user_id')
+    if not post_ids:
+        return jsonify({'error': 'Post IDs required'}), 400
+    if len(post_ids) > MAX_LIKE_BATCH:
+        return jsonify({'error': f'At most {MAX_LIKE_BATCH} post IDs per request'}), 400
+    
+    result = {}
+    for post_id in post_ids:
+        if post_id not in posts:
+            continue
+        likers = post_likers.get(post_id, ())
+        result[post_id] = {
+            'like_count': len(likers),
+            'liked': user_id in likers if user_id else False
+        }
+    
+    return jsonify({'likes': result})
+
+# 18. Bulk Import Posts and Comments (NDJSON)
+@app.route('/api/import', methods=['POST'])
+def bulk_import():
+    # One JSON object per line; posts by default, comments with "type": "comment".
+    # The body is read line by line and stored in batches, and the response
+    # streams one NDJSON result per input line followed by a summary.
+    def generate():
+        batch_posts = {}
+        batch_comments = {}
+        pending_results = []
+        totals = {'posts': 0, 'comments': 0, 'errors': 0}
+        now = datetime.datetime.now().isoformat()
+        
+        for line_number, line in enumerate(iter_stream_lines(request.stream), start=1):
+            if not line.strip():
+                continue
+            result = parse_import_line(line, batch_posts, batch_comments, now)
+            result['line'] = line_number
+            pending_results.append(result)
+            if result['status'] == 'error':
+                totals['errors'] += 1
+            else:
+                totals[result['type'] + 's'] += 1
+            
+            if len(batch_posts) + len(batch_comments) >= IMPORT_BATCH_SIZE:
+                flush_import_batch(batch_posts, batch_comments)
+                for result in pending_results:
+                    yield json.dumps(result) + '\n'
+                pending_results = []
+        
+        flush_import_batch(batch_posts, batch_comments)
+        for result in pending_results:
+            yield json.dumps(result) + '\n'
+        
+        yield json.dumps({'summary': totals}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# 19. Autocomplete Tags
+@app.route('/api/autocomplete/tags', methods=['GET'])
+def autocomplete_tags():
+    prefix = request.args.get('q', '')
+    limit = request.args.get('limit', AUTOCOMPLETE_SIZE, type=int)
+    if not 1 <= limit <= AUTOCOMPLETE_SIZE:
+        return jsonify({'error': f'Limit must be between 1 and {AUTOCOMPLETE_SIZE}'}), 400
+    
+    node = find_tag_node(prefix)
+    suggestions = top_tags(node)[:limit] if node else []
+    
+    return jsonify({
+        'prefix': prefix,
+        'tags': [{'tag': tag, 'count': tag_usage(tag)} for tag in suggestions]
+    })
+
+# 20. Get Trending Posts
+@app.route('/api/posts/trending', methods=['GET'])
+def get_trending_posts():
+    limit = request.args.get('limit', 10, type=int)
+    if not 1 <= limit <= MAX_TRENDING:
+        return jsonify({'error': f'Limit must be between 1 and {MAX_TRENDING}'}), 400
+    fields, error = get_post_projection()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    trending = top_trending(limit)
+    
+    return jsonify({
+        'posts': project_posts([posts[post_id] for post_id, _ in trending], fields),
+        'scores': {post_id: round(score, 4) for post_id, score in trending}
+    })
+
+# 21. Get Storage Stats
+@app.route('/api/stats/storage', methods=['GET'])
+def get_storage_stats():
+    original = compression_stats['original_bytes']
+    compressed = compression_stats['compressed_bytes']
     
-    category_counts = {}
-    for post in posts.values():
-        cat = post['category']
-        category_counts[cat] = category_counts.get(cat, 0) + 1
+    return jsonify({
+        'compression_enabled': app.config['COMPRESS_POST_CONTENT'],
+        'compression_threshold': app.config['COMPRESSION_THRESHOLD'],
+        'compressed_posts': len(compressed_contents),
+        'original_bytes': original,
+        'compressed_bytes': compressed,
+        'bytes_saved': original - compressed,
+        'cache': {
+            'size': len(content_cache),
+            'capacity': CONTENT_CACHE_SIZE,
+            'hits': compression_stats['cache_hits'],
+            'misses': compression_stats['cache_misses']
+        }
+    })
+
+# 22. Get Related Posts
+@app.route('/api/posts/<post_id>/related', methods=['GET'])
+def get_related_posts(post_id):
+    post = posts.get(post_id)
+    if not post:
+        return jsonify({'error': 'Post not found'}), 404
+    
+    limit = request.args.get('limit', 5, type=int)
+    if not 1 <= limit <= MAX_RELATED:
+        return jsonify({'error': f'Limit must be between 1 and {MAX_RELATED}'}), 400
+    fields, error = get_post_projection()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    related = find_related_posts(post, limit)
     
     return jsonify({
-        'total_posts': total_posts,
-        'published_posts': published_posts,
-        'total_comments': total_comments,
-        'total_likes': total_likes,
-        'categories': category_counts,
-        'tags': len(tags)
+        'post_id': post_id,
+        'related': project_posts([posts[related_id] for related_id, _ in related], fields),
+        'scores': {related_id: round(score, 4) for related_id, score in related}
     })
 
 if __name__ == '__main__':
@@ -1,8 +1,20 @@
 from flask import Flask, request, jsonify
 import uuid
 import datetime
+import re
+import math
+import bisect
+import heapq
+import base64
+import json
+import threading
 from functools import wraps
 
+try:
+    import numpy as np
+except ImportError:  # The columnar catalog is optional; dict scans are the fallback
+    np = None
+
 app = Flask(__name__)
 
 # In-memory storage
@@ -17,9 +29,836 @@ categories = {
     'sports': 'Sports and fitness'
 }
 
+# Cart indexes: cart_items stays keyed by "<user_id>_<product_id>" for the
+# cart item endpoints, and each user's items and running total are kept
+# alongside so cart reads and checkout only touch that cart
+user_carts = {}      # user_id -> {product_id: cart item}
+cart_totals = {}     # user_id -> running cart total
+product_carts = {}   # product_id -> set of user ids with the product in their cart
+
+# Catalog indexes for get_products
+category_products = {}  # category -> set of product ids
+price_index = []        # (price, product_id) ascending
+rating_index = []       # (rating, product_id) ascending
+SORT_INDEXES = {'price': price_index, 'rating': rating_index}
+# Guards the catalog indexes above and the search index below; taken before
+# inventory_lock when both are needed
+catalog_lock = threading.Lock()
+# Candidate sets smaller than 1/HEAP_SELECT_RATIO of the catalog are ranked
+# with a heap instead of walking a sorted index
+HEAP_SELECT_RATIO = 8
+MAX_PRODUCT_PAGE = 100
+MAX_ID = chr(0x10ffff)
+
+# Product search: trigrams of every word in name and description, each word
+# padded with spaces so word starts and ends count as grams too
+trigram_index = {}     # trigram -> set of product ids
+product_trigrams = {}  # product_id -> set of trigrams, for unindexing
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+# Share of the query's trigrams (and at least two of them) a product needs
+# for a typo-tolerant match
+SEARCH_MIN_SIMILARITY = 0.3
+SEARCH_MIN_HITS = 2
+
+# Inventory aggregates, kept current by every stock write. stock_index holds
+# (stock, product_id) ascending, so low-stock counts and the replenishment
+# list are bisections instead of catalog scans.
+stock_index = []
+category_stats = {}  # category -> {'count': products, 'stock': units}
+inventory_totals = {'stock': 0}
+inventory_lock = threading.Lock()
+LOW_STOCK_THRESHOLD = 10
+MAX_LOW_STOCK_PAGE = 100
+
+# Columnar mirror of the catalog for vectorized filters and aggregates. Each
+# product owns one row of every column; rows of deleted products are marked
+# dead and reused. Written under inventory_lock alongside the aggregates.
+catalog_columns = {}   # column name -> numpy array
+column_rows = {}       # product_id -> row
+row_products = []      # row -> product_id (None for free rows)
+free_rows = []
+category_codes = {}    # category -> code stored in the category column
+COLUMN_DTYPES = {'price': 'float64', 'stock': 'int64', 'rating': 'float64',
+                 'category': 'int32', 'live': 'bool'}
+MIN_COLUMN_CAPACITY = 1024
+# Unpaginated listings over at least this many candidates filter with masks
+COLUMNAR_MIN_ROWS = 1024
+
+# Batch endpoints
+MAX_BATCH_OPERATIONS = 500
+
+# Order history: (created_at, order_id) pairs per user in ascending order
+user_orders = {}
+MAX_ORDER_PAGE = 100
+
+# "Frequently bought together": sparse co-occurrence counts over order line
+# items, plus each product's top neighbors as (-count, product_id) ascending.
+# Counts only grow, so a neighbor can only enter a full top list on the
+# increment that lifts it past the current last entry.
+co_purchases = {}   # product_id -> {other product_id: orders with both}
+also_bought = {}    # product_id -> top ALSO_BOUGHT_SIZE neighbors
+co_purchase_lock = threading.Lock()
+ALSO_BOUGHT_SIZE = 20
+ORDER_LOG_CHUNK_SIZE = 64 * 1024
+
+# Order analytics: revenue, units and order counts per day, kept current by
+# order placement and status changes. Each day holds order-level cells by
+# status, plus cells by (category, status), where an order counts once for
+# every category it contains.
+order_rollups = {}   # day -> {'orders': {status: cell}, 'categories': {(category, status): cell}}
+rollup_days = []     # days present in order_rollups, ascending
+analytics_lock = threading.Lock()
+ANALYTICS_GROUPS = ('day', 'category', 'status')
+
+# Checkout locking: one lock per product guards its stock, and one lock per
+# user serializes that user's checkouts. Unrelated orders never share a lock.
+product_locks = {}   # product_id -> threading.Lock
+user_locks = {}      # user_id -> threading.Lock
+
 def generate_id():
     return str(uuid.uuid4())
 
+def parse_price(value):
+    # NaN and infinities would break the ordering of price_index
+    price = float(value)
+    if not math.isfinite(price):
+        raise ValueError('Price must be finite')
+    return price
+
+def get_lock(locks, key):
+    lock = locks.get(key)
+    if lock is None:
+        # setdefault is atomic, so racing callers end up sharing one lock
+        lock = locks.setdefault(key, threading.Lock())
+    return lock
+
+def reserve_stock(line_items):
+    # Atomically decrements stock for every line item, or for none of them.
+    # Locks are taken in product id order so overlapping checkouts cannot
+    # deadlock. Returns the id of the first product that is short, or None.
+    product_ids = sorted({item['product_id'] for item in line_items})
+    locks = [get_lock(product_locks, product_id) for product_id in product_ids]
+    for lock in locks:
+        lock.acquire()
+    try:
+        for item in line_items:
+            product = products.get(item['product_id'])
+            if product is None or product['stock'] < item['quantity']:
+                return item['product_id']
+        for item in line_items:
+            adjust_stock(products[item['product_id']], -item['quantity'])
+        return None
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+def cart_summary(user_id):
+    user_cart = []
+    
+    for product_id, item in user_carts.get(user_id, {}).items():
+        product = products[product_id]
+        user_cart.append({
+            'id': f"{user_id}_{product_id}",
+            'product': product,
+            'quantity': item['quantity'],
+            'subtotal': product['price'] * item['quantity'],
+            'added_at': item['added_at']
+        })
+    
+    return {
+        'cart_items': user_cart,
+        'total': round(cart_totals.get(user_id, 0), 2),
+        'item_count': len(user_cart)
+    }
+
+def apply_product_updates(product, updates):
+    # Returns False, changing nothing, when the product was deleted after the
+    # caller looked it up
+    
+    # The product lock keeps checkouts from touching its stock meanwhile
+    with get_lock(product_locks, product['id']):
+        if products.get(product['id']) is not product:
+            return False
+        old_price = product['price']
+        unindex_product(product)
+        product.update(updates)
+        index_product(product)
+    
+    if product['price'] != old_price:
+        reprice_carts(product['id'], old_price)
+    return True
+
+def plan_cart_batch(user_id, operations):
+    # Validates every operation against the cart as it would be after the
+    # preceding ones. Returns ({product_id: final quantity}, errors).
+    cart = user_carts.get(user_id, {})
+    planned = {}
+    errors = []
+    
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors.append({'index': index, 'error': 'Operation must be an object'})
+            continue
+        op = operation.get('op')
+        product_id = operation.get('product_id')
+        quantity = operation.get('quantity', 1 if op == 'add' else None)
+        
+        product = products.get(product_id) if isinstance(product_id, str) else None
+        if not product:
+            errors.append({'index': index, 'error': 'Product not found'})
+            continue
+        current = planned[product_id] if product_id in planned else (
+            cart[product_id]['quantity'] if product_id in cart else 0)
+        
+        if op == 'remove':
+            if not current:
+                errors.append({'index': index, 'error': 'Cart item not found'})
+                continue
+            new_quantity = 0
+        elif op in ('add', 'update'):
+            if (isinstance(quantity, bool) or not isinstance(quantity, int) or
+                    quantity < (1 if op == 'add' else 0)):
+                errors.append({'index': index, 'error': 'Invalid quantity'})
+                continue
+            new_quantity = current + quantity if op == 'add' else quantity
+            if product['stock'] < new_quantity:
+                errors.append({'index': index, 'error': 'Insufficient stock'})
+                continue
+        else:
+            errors.append({'index': index, 'error': 'Op must be add, update or remove'})
+            continue
+        
+        planned[product_id] = new_quantity
+    
+    return planned, errors
+
+def plan_product_batch(updates):
+    # Returns ([(product, parsed fields)], errors)
+    planned = []
+    errors = []
+    
+    for index, update in enumerate(updates):
+        if not isinstance(update, dict):
+            errors.append({'index': index, 'error': 'Update must be an object'})
+            continue
+        product_id = update.get('product_id')
+        product = products.get(product_id) if isinstance(product_id, str) else None
+        if not product:
+            errors.append({'index': index, 'error': 'Product not found'})
+            continue
+        
+        fields = {}
+        try:
+            if 'price' in update:
+                fields['price'] = parse_price(update['price'])
+            if 'stock' in update:
+                fields['stock'] = int(update['stock'])
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': 'Invalid price or stock'})
+            continue
+        if not fields:
+            errors.append({'index': index, 'error': 'Price or stock required'})
+            continue
+        if fields.get('price', 0) < 0 or fields.get('stock', 0) < 0:
+            errors.append({'index': index, 'error': 'Price and stock must not be negative'})
+            continue
+        
+        planned.append((product, fields))
+    
+    return planned, errors
+
+def place_order(user_id, shipping_address):
+    # Returns (order, error)
+    with get_lock(user_locks, user_id):
+        # Get user's cart
+        user_cart = []
+        total = 0
+        
+        for product_id, item in user_carts.get(user_id, {}).items():
+            product = products[product_id]
+            user_cart.append({
+                'product_id': product_id,
+                'quantity': item['quantity'],
+                'price': product['price'],
+                'category': product['category'],
+                'subtotal': product['price'] * item['quantity']
+            })
+            total += product['price'] * item['quantity']
+        
+        if not user_cart:
+            return None, 'Cart is empty'
+        
+        # Reserve stock
+        short_product_id = reserve_stock(user_cart)
+        if short_product_id is not None:
+            product = products.get(short_product_id)
+            name = product['name'] if product else short_product_id
+            return None, f'Insufficient stock for {name}'
+        
+        # Create order
+        order_id = generate_id()
+        order = {
+            'id': order_id,
+            'user_id': user_id,
+            'items': user_cart,
+            'total': total,
+            'shipping_address': shipping_address,
+            'status': 'pending',
+            'created_at': datetime.datetime.now().isoformat(),
+            'updated_at': datetime.datetime.now().isoformat()
+        }
+        
+        # Stored under analytics_lock so rollup and co-purchase rebuilds see
+        # each order exactly once
+        with analytics_lock:
+            orders[order_id] = order
+            add_order_rollup(order, 1)
+            record_co_purchases([item['product_id'] for item in user_cart])
+        bisect.insort(user_orders.setdefault(user_id, []), (order['created_at'], order_id))
+        
+        # Clear cart
+        clear_cart(user_id)
+        
+        return order, None
+
+def bump_co_purchase(product_id, other_id, counts_by_product=co_purchases,
+                     top_by_product=also_bought):
+    # Caller holds co_purchase_lock when updating the live tables
+    counts = counts_by_product.setdefault(product_id, {})
+    count = counts[other_id] = counts.get(other_id, 0) + 1
+    top = top_by_product.setdefault(product_id, [])
+    
+    for position, (_, neighbor) in enumerate(top):
+        if neighbor == other_id:
+            del top[position]
+            break
+    else:
+        if len(top) >= ALSO_BOUGHT_SIZE:
+            if (-count, other_id) >= top[-1]:
+                return
+            top.pop()
+    bisect.insort(top, (-count, other_id))
+
+def count_co_purchases(product_ids, *tables):
+    product_ids = set(product_ids)
+    for product_id in product_ids:
+        for other_id in product_ids:
+            if other_id != product_id:
+                bump_co_purchase(product_id, other_id, *tables)
+
+def record_co_purchases(product_ids):
+    with co_purchase_lock:
+        count_co_purchases(product_ids)
+
+def rebuild_co_purchases(order_stream):
+    # Counts an iterable of orders in a single pass into fresh tables, then
+    # swaps them in, so an order log can be streamed instead of held in memory
+    counts_by_product = {}
+    top_by_product = {}
+    processed = 0
+    for order in order_stream:
+        count_co_purchases((item['product_id'] for item in order['items']),
+                           counts_by_product, top_by_product)
+        processed += 1
+    
+    with co_purchase_lock:
+        co_purchases.clear()
+        co_purchases.update(counts_by_product)
+        also_bought.clear()
+        also_bought.update(top_by_product)
+    return processed
+
+def iter_stream_lines(stream):
+    # Reads fixed-size chunks so the body is never buffered whole
+    remainder = b''
+    while True:
+        chunk = stream.read(ORDER_LOG_CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (remainder + chunk).split(b'\n')
+        remainder = lines.pop()
+        yield from lines
+    if remainder:
+        yield remainder
+
+def iter_order_log(lines, errors):
+    # Yields orders from NDJSON lines; numbers of lines that are not orders
+    # are appended to `errors`
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            order = json.loads(line)
+            items = order['items']
+            if all(isinstance(item, dict) and isinstance(item.get('product_id'), str)
+                   for item in items):
+                yield order
+                continue
+        except (ValueError, TypeError, KeyError):
+            pass
+        errors.append(line_number)
+
+def rollup_day(day):
+    # Caller holds analytics_lock
+    buckets = order_rollups.get(day)
+    if buckets is None:
+        buckets = order_rollups[day] = {'orders': {}, 'categories': {}}
+        bisect.insort(rollup_days, day)
+    return buckets
+
+def add_to_cell(cells, key, revenue, units, count):
+    cell = cells.setdefault(key, {'revenue': 0.0, 'units': 0, 'orders': 0})
+    cell['revenue'] += revenue
+    cell['units'] += units
+    cell['orders'] += count
+
+def item_category(item):
+    # Orders placed before line items recorded their category
+    product = products.get(item['product_id'])
+    return item.get('category') or (product['category'] if product else 'uncategorized')
+
+def add_order_rollup(order, sign, status=None):
+    # Adds (sign=1) or removes (sign=-1) an order's contribution under its
+    # status, or under `status` when given. Caller holds analytics_lock.
+    status = status or order['status']
+    buckets = rollup_day(order['created_at'][:10])
+    
+    by_category = {}
+    for item in order['items']:
+        totals = by_category.setdefault(item_category(item), [0.0, 0])
+        totals[0] += item['subtotal']
+        totals[1] += item['quantity']
+    
+    add_to_cell(buckets['orders'], status, sign * order['total'],
+                sign * sum(totals[1] for totals in by_category.values()), sign)
+    for category, (revenue, units) in by_category.items():
+        add_to_cell(buckets['categories'], (category, status), sign * revenue, sign * units, sign)
+
+def set_order_status(order, status):
+    # Moves the order's rollup contribution along with its status
+    with analytics_lock:
+        if order['status'] != status:
+            add_order_rollup(order, -1)
+            add_order_rollup(order, 1, status)
+            order['status'] = status
+        order['updated_at'] = datetime.datetime.now().isoformat()
+
+def rebuild_order_rollups(order_list):
+    # Recomputes the rollups from scratch for backfills. With numpy the line
+    # items are grouped with vectorized bincounts instead of per-order updates.
+    with analytics_lock:
+        order_list = list(order_list)
+        order_rollups.clear()
+        rollup_days.clear()
+        if np is None:
+            for order in order_list:
+                add_order_rollup(order, 1)
+            return
+        
+        # Dictionary-encode days, statuses and categories
+        days, statuses, item_category_codes = {}, {}, {}
+        order_days, order_statuses, order_totals = [], [], []
+        item_days, item_statuses, item_categories = [], [], []
+        item_orders, item_revenue, item_units = [], [], []
+        for number, order in enumerate(order_list):
+            day = days.setdefault(order['created_at'][:10], len(days))
+            status = statuses.setdefault(order['status'], len(statuses))
+            order_days.append(day)
+            order_statuses.append(status)
+            order_totals.append(order['total'])
+            for item in order['items']:
+                category = item_category_codes.setdefault(item_category(item), len(item_category_codes))
+                item_days.append(day)
+                item_statuses.append(status)
+                item_categories.append(category)
+                item_orders.append(number)
+                item_revenue.append(item['subtotal'])
+                item_units.append(item['quantity'])
+        if not order_days:
+            return
+        
+        day_names = list(days)
+        status_names = list(statuses)
+        category_names = list(item_category_codes)
+        order_count = len(order_days)
+        item_orders = np.array(item_orders, dtype='int64')
+        item_units = np.array(item_units, dtype='float64')
+        
+        # Order-level cells, keyed day * statuses + status
+        keys = np.array(order_days, dtype='int64') * len(statuses) + np.array(order_statuses)
+        units = np.bincount(item_orders, weights=item_units, minlength=order_count)
+        width = len(days) * len(statuses)
+        cells = zip(np.bincount(keys, weights=np.array(order_totals), minlength=width).tolist(),
+                    np.bincount(keys, weights=units, minlength=width).tolist(),
+                    np.bincount(keys, minlength=width).tolist())
+        for key, (revenue, unit_count, count) in enumerate(cells):
+            if count:
+                day, status = divmod(key, len(statuses))
+                rollup_day(day_names[day])['orders'][status_names[status]] = {
+                    'revenue': revenue, 'units': int(unit_count), 'orders': count}
+        
+        # Category cells, keyed (day * categories + category) * statuses + status.
+        # An order counts once per category, so (key, order) pairs are deduplicated.
+        keys = ((np.array(item_days, dtype='int64') * len(category_names) + np.array(item_categories))
+                * len(statuses) + np.array(item_statuses))
+        order_keys = np.unique(keys * order_count + item_orders) // order_count
+        width = len(days) * len(category_names) * len(statuses)
+        cells = zip(np.bincount(keys, weights=np.array(item_revenue), minlength=width).tolist(),
+                    np.bincount(keys, weights=item_units, minlength=width).tolist(),
+                    np.bincount(order_keys, minlength=width).tolist())
+        for key, (revenue, unit_count, count) in enumerate(cells):
+            if count:
+                key, status = divmod(key, len(statuses))
+                day, category = divmod(key, len(category_names))
+                cell_key = (category_names[category], status_names[status])
+                rollup_day(day_names[day])['categories'][cell_key] = {
+                    'revenue': revenue, 'units': int(unit_count), 'orders': count}
+
+def index_product(product):
+    grams = text_trigrams(f"{product['name']} {product.get('description', '')}")
+    with catalog_lock:
+        category_products.setdefault(product['category'], set()).add(product['id'])
+        bisect.insort(price_index, (product['price'], product['id']))
+        bisect.insort(rating_index, (product['rating'], product['id']))
+        product_trigrams[product['id']] = grams
+        for gram in grams:
+            trigram_index.setdefault(gram, set()).add(product['id'])
+    
+    with inventory_lock:
+        bisect.insort(stock_index, (product['stock'], product['id']))
+        stats = category_stats.setdefault(product['category'], {'count': 0, 'stock': 0})
+        stats['count'] += 1
+        stats['stock'] += product['stock']
+        inventory_totals['stock'] += product['stock']
+        write_product_row(product)
+
+def unindex_product(product):
+    with catalog_lock:
+        ids = category_products[product['category']]
+        ids.discard(product['id'])
+        if not ids:
+            del category_products[product['category']]
+        remove_index_entry(price_index, (product['price'], product['id']))
+        remove_index_entry(rating_index, (product['rating'], product['id']))
+        for gram in product_trigrams.pop(product['id'], ()):
+            ids = trigram_index[gram]
+            ids.discard(product['id'])
+            if not ids:
+                del trigram_index[gram]
+    
+    with inventory_lock:
+        remove_index_entry(stock_index, (product['stock'], product['id']))
+        stats = category_stats[product['category']]
+        stats['count'] -= 1
+        stats['stock'] -= product['stock']
+        if not stats['count']:
+            del category_stats[product['category']]
+        inventory_totals['stock'] -= product['stock']
+        free_product_row(product)
+
+def adjust_stock(product, delta):
+    # Caller holds the product's lock
+    with inventory_lock:
+        remove_index_entry(stock_index, (product['stock'], product['id']))
+        product['stock'] += delta
+        bisect.insort(stock_index, (product['stock'], product['id']))
+        category_stats[product['category']]['stock'] += delta
+        inventory_totals['stock'] += delta
+        if np is not None:
+            catalog_columns['stock'][column_rows[product['id']]] = product['stock']
+
+def category_code(category):
+    code = category_codes.get(category)
+    if code is None:
+        code = category_codes[category] = len(category_codes)
+    return code
+
+def grow_columns(capacity):
+    for name, dtype in COLUMN_DTYPES.items():
+        column = np.zeros(capacity, dtype=dtype)
+        old = catalog_columns.get(name)
+        if old is not None:
+            column[:len(old)] = old
+        catalog_columns[name] = column
+
+def write_product_row(product):
+    # Caller holds inventory_lock
+    if np is None:
+        return
+    row = column_rows.get(product['id'])
+    if row is None:
+        if free_rows:
+            row = free_rows.pop()
+            row_products[row] = product['id']
+        else:
+            row = len(row_products)
+            row_products.append(product['id'])
+            if row >= len(catalog_columns.get('live', ())):
+                grow_columns(max(MIN_COLUMN_CAPACITY, 2 * row))
+        column_rows[product['id']] = row
+    
+    catalog_columns['price'][row] = product['price']
+    catalog_columns['stock'][row] = product['stock']
+    catalog_columns['rating'][row] = product['rating']
+    catalog_columns['category'][row] = category_code(product['category'])
+    catalog_columns['live'][row] = True
+
+def free_product_row(product):
+    # Caller holds inventory_lock
+    row = column_rows.pop(product['id'], None)
+    if row is None:
+        return
+    catalog_columns['live'][row] = False
+    row_products[row] = None
+    free_rows.append(row)
+
+def rebuild_catalog_columns():
+    # Bulk load of the columns from products, for backfills and large imports
+    if np is None:
+        return
+    with inventory_lock:
+        catalog_columns.clear()
+        column_rows.clear()
+        free_rows.clear()
+        row_products[:] = list(products)
+        size = len(row_products)
+        grow_columns(max(MIN_COLUMN_CAPACITY, size))
+        for name in ('price', 'stock', 'rating'):
+            catalog_columns[name][:size] = np.fromiter(
+                (product[name] for product in products.values()), COLUMN_DTYPES[name], size)
+        catalog_columns['category'][:size] = np.fromiter(
+            (category_code(product['category']) for product in products.values()), 'int32', size)
+        catalog_columns['live'][:size] = True
+        column_rows.update((product_id, row) for row, product_id in enumerate(row_products))
+
+def column_filter(category, min_price, max_price):
+    # Product ids matching the category and inclusive price range, in price
+    # order like the price index. Runs as vectorized masks over the columns.
+    with inventory_lock:
+        size = len(row_products)
+        prices = catalog_columns['price'][:size]
+        mask = catalog_columns['live'][:size].copy()
+        if category:
+            if category not in category_codes:
+                return []
+            mask &= catalog_columns['category'][:size] == category_codes[category]
+        if min_price is not None:
+            mask &= prices >= min_price
+        if max_price is not None:
+            mask &= prices <= max_price
+        rows = np.flatnonzero(mask)
+        rows = rows[np.argsort(prices[rows], kind='stable')]
+        return [row_products[row] for row in rows.tolist()]
+
+def inventory_breakdown(threshold):
+    # Per-category stock value, low-stock count and average price and rating.
+    # Vectorized reductions over the columns, or a dict scan without numpy.
+    breakdown = {}
+    if np is None:
+        for product in products.values():
+            stats = breakdown.setdefault(product['category'], {
+                'count': 0, 'value': 0.0, 'low_stock': 0, 'price': 0.0, 'rating': 0.0})
+            stats['count'] += 1
+            stats['value'] += product['price'] * product['stock']
+            stats['low_stock'] += product['stock'] < threshold
+            stats['price'] += product['price']
+            stats['rating'] += product['rating']
+        counts = {category: stats['count'] for category, stats in breakdown.items()}
+        sums = breakdown
+    else:
+        with inventory_lock:
+            size = len(row_products)
+            live = catalog_columns['live'][:size]
+            codes = catalog_columns['category'][:size][live]
+            prices = catalog_columns['price'][:size][live]
+            stock = catalog_columns['stock'][:size][live]
+            ratings = catalog_columns['rating'][:size][live]
+            width = len(category_codes)
+            code_counts = np.bincount(codes, minlength=width).tolist()
+            columns = {
+                'value': np.bincount(codes, weights=prices * stock, minlength=width).tolist(),
+                'low_stock': np.bincount(codes[stock < threshold], minlength=width).tolist(),
+                'price': np.bincount(codes, weights=prices, minlength=width).tolist(),
+                'rating': np.bincount(codes, weights=ratings, minlength=width).tolist()
+            }
+        counts = {category: code_counts[code] for category, code in category_codes.items()
+                  if code_counts[code]}
+        sums = {category: {name: values[category_codes[category]] for name, values in columns.items()}
+                for category in counts}
+    
+    return {
+        category: {
+            'count': count,
+            'inventory_value': round(sums[category]['value'], 2),
+            'low_stock_items': int(sums[category]['low_stock']),
+            'average_price': round(sums[category]['price'] / count, 2),
+            'average_rating': round(sums[category]['rating'] / count, 2)
+        }
+        for category, count in counts.items()
+    }
+
+def word_trigrams(word):
+    padded = f' {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def text_trigrams(text):
+    grams = set()
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        grams |= word_trigrams(word)
+    return grams
+
+def search_products(query):
+    # Returns {product_id: relevance} for products whose name or description
+    # contains the query, or whose trigrams are close enough to it to be a
+    # typo. Only the postings of the query's trigrams are read. Caller holds
+    # catalog_lock.
+    query = query.strip().lower()
+    words = TOKEN_PATTERN.findall(query)
+    if not words:
+        return {}
+    
+    grams = set()
+    for word in words:
+        grams |= word_trigrams(word)
+    # Grams without padding occur in any text containing the query as a substring
+    inner = {gram for gram in grams if ' ' not in gram}
+    
+    hits = {}
+    inner_hits = {}
+    for gram in grams:
+        for product_id in trigram_index.get(gram, ()):
+            hits[product_id] = hits.get(product_id, 0) + 1
+            if gram in inner:
+                inner_hits[product_id] = inner_hits.get(product_id, 0) + 1
+    
+    if inner:
+        substring_candidates = [product_id for product_id, count in inner_hits.items()
+                                if count == len(inner)]
+    else:
+        # Queries shorter than a trigram: use the grams that contain them
+        substring_candidates = set()
+        for gram, ids in trigram_index.items():
+            if query in gram:
+                substring_candidates |= ids
+    
+    scores = {}
+    for product_id in substring_candidates:
+        product = products[product_id]
+        if query in product['name'].lower():
+            scores[product_id] = 2
+        elif query in product.get('description', '').lower():
+            scores[product_id] = 1
+    
+    # Exact matches rank above typo matches; closer trigram overlap ranks higher
+    for product_id, count in hits.items():
+        similarity = count / len(grams)
+        if product_id in scores:
+            scores[product_id] += similarity
+        elif similarity >= SEARCH_MIN_SIMILARITY and count >= SEARCH_MIN_HITS:
+            scores[product_id] = similarity
+    
+    return scores
+
+def remove_index_entry(index, key):
+    position = bisect.bisect_left(index, key)
+    if position < len(index) and index[position] == key:
+        del index[position]
+
+def price_range(min_price, max_price):
+    # Slice bounds of price_index for the inclusive price range
+    low = bisect.bisect_left(price_index, (min_price,)) if min_price is not None else 0
+    high = bisect.bisect_right(price_index, (max_price, MAX_ID)) if max_price is not None else len(price_index)
+    return low, max(low, high)
+
+def encode_cursor(value):
+    raw = json.dumps(value, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, value_types):
+    # Returns a (sort value, id) key, or None for malformed cursors
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if (isinstance(value, list) and len(value) == 2 and
+            isinstance(value[0], value_types) and isinstance(value[1], str)):
+        return tuple(value)
+    return None
+
+def walk_index(index, low, high, descending, after):
+    # Yields product ids from index[low:high] in order, strictly after the
+    # keyset bound `after` when given
+    if descending:
+        end = bisect.bisect_left(index, after, low, high) if after else high
+        for position in range(end - 1, low - 1, -1):
+            yield index[position][1]
+    else:
+        start = bisect.bisect_right(index, after, low, high) if after else low
+        for position in range(start, high):
+            yield index[position][1]
+
+def set_cart_quantity(user_id, product_id, quantity):
+    # Adds, updates or (for quantity <= 0) removes a cart item and keeps the
+    # user's running total in step. Returns the cart item or None.
+    cart_key = f"{user_id}_{product_id}"
+    price = products[product_id]['price']
+    item = cart_items.get(cart_key)
+    old_quantity = item['quantity'] if item else 0
+    
+    if quantity <= 0:
+        if item:
+            remove_cart_item(cart_key)
+        return None
+    
+    if item is None:
+        item = {
+            'user_id': user_id,
+            'product_id': product_id,
+            'quantity': quantity,
+            'added_at': datetime.datetime.now().isoformat()
+        }
+        cart_items[cart_key] = item
+        user_carts.setdefault(user_id, {})[product_id] = item
+        product_carts.setdefault(product_id, set()).add(user_id)
+    else:
+        item['quantity'] = quantity
+    
+    cart_totals[user_id] = cart_totals.get(user_id, 0) + price * (quantity - old_quantity)
+    return item
+
+def remove_cart_item(cart_key):
+    item = cart_items.pop(cart_key)
+    user_id = item['user_id']
+    product_id = item['product_id']
+    
+    user_cart = user_carts[user_id]
+    del user_cart[product_id]
+    product_carts[product_id].discard(user_id)
+    if not product_carts[product_id]:
+        del product_carts[product_id]
+    
+    if user_cart:
+        cart_totals[user_id] -= products[product_id]['price'] * item['quantity']
+    else:
+        # Reset rather than subtract so float error cannot accumulate
+        del user_carts[user_id]
+        del cart_totals[user_id]
+
+def clear_cart(user_id):
+    for product_id in list(user_carts.get(user_id, {})):
+        remove_cart_item(f"{user_id}_{product_id}")
+
+def reprice_carts(product_id, old_price):
+    # Applies a product price change to every cart that holds it
+    delta = products[product_id]['price'] - old_price
+    for user_id in list(product_carts.get(product_id, ())):
+        with get_lock(user_locks, user_id):
+            item = user_carts.get(user_id, {}).get(product_id)
+            if item:
+                cart_totals[user_id] += delta * item['quantity']
+
 # Sample products
 sample_products = [
     {
@@ -48,6 +887,7 @@ sample_products = [
 
 for product in sample_products:
     products[product['id']] = product
+    index_product(product)
 
 # 1. Get All Products
 @app.route('/api/products', methods=['GET'])
@@ -55,30 +895,116 @@ def get_products():
     category = request.args.get('category')
     min_price = request.args.get('min_price', type=float)
     max_price = request.args.get('max_price', type=float)
-    search = request.args.get('search', '').lower()
+    search = request.args.get('search', '')
+    sort = request.args.get('sort')
+    order = request.args.get('order')
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
     
-    filtered_products = []
+    if sort is not None and sort not in SORT_INDEXES:
+        return jsonify({'error': 'Sort must be price or rating'}), 400
+    if order not in (None, 'asc', 'desc'):
+        return jsonify({'error': 'Order must be asc or desc'}), 400
     
-    for product in products.values():
-        # Category filter
-        if category and product['category'] != category:
-            continue
+    unpaginated = sort is None and limit is None and cursor is None
+    if not unpaginated:
+        sort = sort or 'price'
+        descending = (order or ('desc' if sort == 'rating' else 'asc')) == 'desc'
+        limit = min(limit or 20, MAX_PRODUCT_PAGE)
+        if limit < 1:
+            return jsonify({'error': 'Limit must be positive'}), 400
+        after = None
+        if cursor:
+            after = decode_cursor(cursor, (int, float))
+            if after is None:
+                return jsonify({'error': 'Invalid cursor'}), 400
+    
+    with catalog_lock:
+        # Candidate sources: the category set and the price range slice
+        low, high = price_range(min_price, max_price)
+        category_ids = category_products.get(category, set()) if category else None
+        search_scores = search_products(search) if search else None
         
-        # Price filter
-        if min_price and product['price'] < min_price:
-            continue
-        if max_price and product['price'] > max_price:
-            continue
+        def matches(product_id):
+            product = products[product_id]
+            # Category filter
+            if category_ids is not None and product_id not in category_ids:
+                return False
+            # Price filter
+            if min_price is not None and product['price'] < min_price:
+                return False
+            if max_price is not None and product['price'] > max_price:
+                return False
+            # Search filter
+            if search_scores is not None and product_id not in search_scores:
+                return False
+            return True
         
-        # Search filter
-        if search and search not in product['name'].lower():
-            continue
+        # Drive from whichever source is smaller
+        candidates = [product_id for _, product_id in price_index[low:high]]
+        for ids in (category_ids, search_scores):
+            if ids is not None and len(ids) < len(candidates):
+                candidates = ids
         
-        filtered_products.append(product)
+        # Unpaginated listing, as before sort and pagination were added.
+        # Search results come back most relevant first, everything else in
+        # price_index order whichever source the candidates came from.
+        if unpaginated:
+            if np is not None and len(candidates) >= COLUMNAR_MIN_ROWS:
+                filtered_ids = column_filter(category, min_price, max_price)
+                if search_scores is not None:
+                    filtered_ids = [product_id for product_id in filtered_ids if product_id in search_scores]
+            else:
+                filtered_ids = [product_id for product_id in candidates if matches(product_id)]
+            if search_scores is not None:
+                filtered_ids.sort(key=lambda product_id: (-search_scores[product_id], product_id))
+            else:
+                filtered_ids.sort(key=lambda product_id: (products[product_id]['price'], product_id))
+            filtered_products = [products[product_id] for product_id in filtered_ids]
+        else:
+            if len(candidates) * HEAP_SELECT_RATIO < len(products):
+                # Top-k heap selection over a small candidate set
+                keyed = []
+                for product_id in candidates:
+                    key = (products[product_id][sort], product_id)
+                    if after and (key >= after if descending else key <= after):
+                        continue
+                    if matches(product_id):
+                        keyed.append(key)
+                select = heapq.nlargest if descending else heapq.nsmallest
+                page_ids = [product_id for _, product_id in select(limit + 1, keyed)]
+            else:
+                # Walk the sorted index; price sorts only need the price range slice
+                if sort == 'price':
+                    ordered = walk_index(price_index, low, high, descending, after)
+                else:
+                    ordered = walk_index(rating_index, 0, len(rating_index), descending, after)
+                page_ids = []
+                for product_id in ordered:
+                    if matches(product_id):
+                        page_ids.append(product_id)
+                        if len(page_ids) > limit:
+                            break
+            page_products = [products[product_id] for product_id in page_ids[:limit]]
+    
+    if unpaginated:
+        return jsonify({
+            'products': filtered_products,
+            'total': len(filtered_products)
+        })
+    
+    next_cursor = None
+    if len(page_ids) > limit:
+        last = page_products[-1]
+        next_cursor = encode_cursor([last[sort], last['id']])
     
     return jsonify({
-        'products': filtered_products,
-        'total': len(filtered_products)
+        'products': page_products,
+        'count': len(page_products),
+        'sort': sort,
+        'order': 'desc' if descending else 'asc',
+        'limit': limit,
+        'next_cursor': next_cursor
     })
 
 # 2. Get Single Product
@@ -112,49 +1038,21 @@ def add_to_cart():
         return jsonify({'error': 'Insufficient stock'}), 400
     
     cart_key = f"{user_id}_{product_id}"
-    
-    if cart_key in cart_items:
-        cart_items[cart_key]['quantity'] += quantity
-    else:
-        cart_items[cart_key] = {
-            'user_id': user_id,
-            'product_id': product_id,
-            'quantity': quantity,
-            'added_at': datetime.datetime.now().isoformat()
-        }
+    # The user's lock keeps cart edits out of a checkout in progress
+    with get_lock(user_locks, user_id):
+        current_quantity = cart_items[cart_key]['quantity'] if cart_key in cart_items else 0
+        cart_item = set_cart_quantity(user_id, product_id, current_quantity + quantity)
     
     return jsonify({
         'message': 'Product added to cart',
-        'cart_item': cart_items[cart_key]
+        'cart_item': cart_item
     })
 
 # 4. Get Cart
 @app.route('/api/cart', methods=['GET'])
 def get_cart():
     user_id = request.args.get('user_id', 'anonymous')
-    
-    user_cart = []
-    total = 0
-    
-    for cart_key, item in cart_items.items():
-        if item['user_id'] == user_id:
-            product = products.get(item['product_id'])
-            if product:
-                cart_item = {
-                    'id': cart_key,
-                    'product': product,
-                    'quantity': item['quantity'],
-                    'subtotal': product['price'] * item['quantity'],
-                    'added_at': item['added_at']
-                }
-                user_cart.append(cart_item)
-                total += cart_item['subtotal']
-    
-    return jsonify({
-        'cart_items': user_cart,
-        'total': total,
-        'item_count': len(user_cart)
-    })
+    return jsonify(cart_summary(user_id))
 
 # 5. Update Cart Item
 @app.route('/api/cart/<cart_item_id>', methods=['PUT'])
@@ -179,11 +1077,15 @@ def update_cart_item(cart_item_id):
     if product['stock'] < quantity:
         return jsonify({'error': 'Insufficient stock'}), 400
     
-    if quantity <= 0:
-        del cart_items[cart_item_id]
-        return jsonify({'message': 'Item removed from cart'})
+    with get_lock(user_locks, cart_item['user_id']):
+        # A checkout may have consumed the item while we waited
+        if cart_items.get(cart_item_id) is not cart_item:
+            return jsonify({'error': 'Cart item not found'}), 404
+        if quantity <= 0:
+            remove_cart_item(cart_item_id)
+            return jsonify({'message': 'Item removed from cart'})
+        set_cart_quantity(cart_item['user_id'], cart_item['product_id'], quantity)
     
-    cart_item['quantity'] = quantity
     return jsonify({
         'message': 'Cart updated',
         'cart_item': cart_item
@@ -192,10 +1094,14 @@ def update_cart_item(cart_item_id):
 # 6. Remove from Cart
 @app.route('/api/cart/<cart_item_id>', methods=['DELETE'])
 def remove_from_cart(cart_item_id):
-    if cart_item_id not in cart_items:
+    cart_item = cart_items.get(cart_item_id)
+    if not cart_item:
         return jsonify({'error': 'Cart item not found'}), 404
     
-    del cart_items[cart_item_id]
+    with get_lock(user_locks, cart_item['user_id']):
+        if cart_items.get(cart_item_id) is not cart_item:
+            return jsonify({'error': 'Cart item not found'}), 404
+        remove_cart_item(cart_item_id)
     return jsonify({'message': 'Item removed from cart'})
 
 # 7. Create Order
@@ -211,52 +1117,9 @@ def create_order():
     if not all([user_id, shipping_address]):
         return jsonify({'error': 'User ID and shipping address required'}), 400
     
-    # Get user's cart
-    user_cart = []
-    total = 0
-    
-    for cart_key, item in cart_items.items():
-        if item['user_id'] == user_id:
-            product = products.get(item['product_id'])
-            if product:
-                if product['stock'] < item['quantity']:
-                    return jsonify({'error': f'Insufficient stock for {product["name"]}'}), 400
-                
-                user_cart.append({
-                    'product_id': item['product_id'],
-                    'quantity': item['quantity'],
-                    'price': product['price'],
-                    'subtotal': product['price'] * item['quantity']
-                })
-                total += product['price'] * item['quantity']
-    
-    if not user_cart:
-        return jsonify({'error': 'Cart is empty'}), 400
-    
-    # Create order
-    order_id = generate_id()
-    order = {
-        'id': order_id,
-        'user_id': user_id,
-        'items': user_cart,
-        'total': total,
-        'shipping_address': shipping_address,
-        'status': 'pending',
-        'created_at': datetime.datetime.now().isoformat(),
-        'updated_at': datetime.datetime.now().isoformat()
-    }
-    
-    orders[order_id] = order
-    
-    # Update stock
-    for item in user_cart:
-        product = products[item['product_id']]
-        product['stock'] -= item['quantity']
-    
-    # Clear cart
-    cart_keys_to_remove = [key for key, item in cart_items.items() if item['user_id'] == user_id]
-    for key in cart_keys_to_remove:
-        del cart_items[key]
+    order, error = place_order(user_id, shipping_address)
+    if error:
+        return jsonify({'error': error}), 400
     
     return jsonify({
         'message': 'Order created successfully',
@@ -270,8 +1133,56 @@ def get_orders():
     if not user_id:
         return jsonify({'error': 'User ID required'}), 400
     
-    user_orders = [order for order in orders.values() if order['user_id'] == user_id]
-    return jsonify({'orders': user_orders})
+    status = request.args.get('status')
+    view = request.args.get('view', 'full')
+    limit = request.args.get('limit', 20, type=int)
+    cursor = request.args.get('cursor')
+    
+    if view not in ('full', 'summary'):
+        return jsonify({'error': 'Invalid view'}), 400
+    if not 1 <= limit <= MAX_ORDER_PAGE:
+        return jsonify({'error': f'Limit must be between 1 and {MAX_ORDER_PAGE}'}), 400
+    
+    history = user_orders.get(user_id, [])
+    end = len(history)
+    if cursor:
+        before = decode_cursor(cursor, str)
+        if before is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        end = bisect.bisect_left(history, before)
+    
+    # Newest first, filtering by status as we go
+    page_orders = []
+    has_more = False
+    for position in range(end - 1, -1, -1):
+        order = orders[history[position][1]]
+        if status and order['status'] != status:
+            continue
+        if len(page_orders) == limit:
+            has_more = True
+            break
+        page_orders.append(order)
+    
+    next_cursor = None
+    if has_more:
+        last = page_orders[-1]
+        next_cursor = encode_cursor([last['created_at'], last['id']])
+    
+    if view == 'summary':
+        page_orders = [{
+            'id': order['id'],
+            'status': order['status'],
+            'total': order['total'],
+            'item_count': len(order['items']),
+            'created_at': order['created_at'],
+            'updated_at': order['updated_at']
+        } for order in page_orders]
+    
+    return jsonify({
+        'orders': page_orders,
+        'limit': limit,
+        'next_cursor': next_cursor
+    })
 
 # 9. Get Order Details
 @app.route('/api/orders/<order_id>', methods=['GET'])
@@ -292,13 +1203,15 @@ def update_order_status(order_id):
     status = data.get('status')
     if not status:
         return jsonify({'error': 'Status required'}), 400
+    # Statuses are rollup keys
+    if not isinstance(status, str):
+        return jsonify({'error': 'Status must be a string'}), 400
     
     order = orders.get(order_id)
     if not order:
         return jsonify({'error': 'Order not found'}), 404
     
-    order['status'] = status
-    order['updated_at'] = datetime.datetime.now().isoformat()
+    set_order_status(order, status)
     
     return jsonify({
         'message': 'Order status updated',
@@ -325,20 +1238,27 @@ def add_product():
     if data['category'] not in categories:
         return jsonify({'error': 'Invalid category'}), 400
     
+    try:
+        price = parse_price(data['price'])
+        stock = int(data['stock'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid price or stock'}), 400
+    
     product_id = generate_id()
     product = {
         'id': product_id,
         'name': data['name'],
         'description': data['description'],
-        'price': float(data['price']),
+        'price': price,
         'category': data['category'],
-        'stock': int(data['stock']),
+        'stock': stock,
         'images': data.get('images', []),
         'rating': 0.0,
         'reviews': 0
     }
     
     products[product_id] = product
+    index_product(product)
     
     return jsonify({
         'message': 'Product added successfully',
@@ -356,15 +1276,24 @@ def update_product(product_id):
     if not product:
         return jsonify({'error': 'Product not found'}), 404
     
-    # Update fields
-    for field in ['name', 'description', 'price', 'category', 'stock', 'images']:
-        if field in data:
-            if field == 'price':
-                product[field] = float(data[field])
-            elif field == 'stock':
-                product[field] = int(data[field])
-            else:
-                product[field] = data[field]
+    if 'category' in data and data['category'] not in categories:
+        return jsonify({'error': 'Invalid category'}), 400
+    
+    updates = {}
+    try:
+        for field in ['name', 'description', 'price', 'category', 'stock', 'images']:
+            if field in data:
+                if field == 'price':
+                    updates[field] = parse_price(data[field])
+                elif field == 'stock':
+                    updates[field] = int(data[field])
+                else:
+                    updates[field] = data[field]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid price or stock'}), 400
+    
+    if not apply_product_updates(product, updates):
+        return jsonify({'error': 'Product not found'}), 404
     
     return jsonify({
         'message': 'Product updated successfully',
@@ -377,29 +1306,257 @@ def delete_product(product_id):
     if product_id not in products:
         return jsonify({'error': 'Product not found'}), 404
     
-    del products[product_id]
+    # Drop the product from any carts holding it
+    for user_id in list(product_carts.get(product_id, ())):
+        with get_lock(user_locks, user_id):
+            cart_key = f"{user_id}_{product_id}"
+            if cart_key in cart_items:
+                remove_cart_item(cart_key)
+    
+    with get_lock(product_locks, product_id):
+        # A concurrent delete may have won the lock first
+        product = products.get(product_id)
+        if not product:
+            return jsonify({'error': 'Product not found'}), 404
+        unindex_product(product)
+        del products[product_id]
     return jsonify({'message': 'Product deleted successfully'})
 
 # 15. Get Inventory Stats
 @app.route('/api/inventory/stats', methods=['GET'])
 def get_inventory_stats():
-    total_products = len(products)
-    total_stock = sum(product['stock'] for product in products.values())
-    low_stock = len([p for p in products.values() if p['stock'] < 10])
-    
-    category_stats = {}
-    for product in products.values():
-        cat = product['category']
-        if cat not in category_stats:
-            category_stats[cat] = {'count': 0, 'stock': 0}
-        category_stats[cat]['count'] += 1
-        category_stats[cat]['stock'] += product['stock']
+    threshold = request.args.get('threshold', LOW_STOCK_THRESHOLD, type=int)
+    view = request.args.get('view', 'summary')
+    if view not in ('summary', 'detailed'):
+        return jsonify({'error': 'Invalid view'}), 400
+    
+    with inventory_lock:
+        low_stock = bisect.bisect_left(stock_index, (threshold,))
+        stats = {
+            'total_products': len(products),
+            'total_stock': inventory_totals['stock'],
+            'low_stock_items': low_stock,
+            'low_stock_threshold': threshold,
+            'category_stats': {cat: dict(values) for cat, values in category_stats.items()}
+        }
+    
+    # Value, low-stock and average breakdowns are reduced over the whole catalog
+    if view == 'detailed':
+        stats['category_breakdown'] = inventory_breakdown(threshold)
+    
+    return jsonify(stats)
+
+# 16. Get Low Stock Products (replenishment list)
+@app.route('/api/inventory/low-stock', methods=['GET'])
+def get_low_stock_products():
+    threshold = request.args.get('threshold', LOW_STOCK_THRESHOLD, type=int)
+    limit = request.args.get('limit', 20, type=int)
+    cursor = request.args.get('cursor')
+    if not 1 <= limit <= MAX_LOW_STOCK_PAGE:
+        return jsonify({'error': f'Limit must be between 1 and {MAX_LOW_STOCK_PAGE}'}), 400
+    
+    after = None
+    if cursor:
+        after = decode_cursor(cursor, int)
+        if after is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    # Lowest stock first, up to the threshold
+    with inventory_lock:
+        end = bisect.bisect_left(stock_index, (threshold,))
+        start = bisect.bisect_right(stock_index, after, 0, end) if after else 0
+        page_keys = stock_index[start:min(start + limit, end)]
+        has_more = start + limit < end
+    
+    page_products = [products[product_id] for _, product_id in page_keys]
+    next_cursor = None
+    if has_more and page_keys:
+        next_cursor = encode_cursor(list(page_keys[-1]))
+    
+    return jsonify({
+        'products': page_products,
+        'threshold': threshold,
+        'limit': limit,
+        'next_cursor': next_cursor
+    })
+
+# 17. Batch Cart Operations
+@app.route('/api/cart/batch', methods=['POST'])
+def batch_cart():
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    user_id = data.get('user_id', 'anonymous')
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Operations required'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+    
+    # All or nothing: validate the whole batch, then apply one final
+    # quantity per product
+    with get_lock(user_locks, user_id):
+        planned, errors = plan_cart_batch(user_id, operations)
+        if errors:
+            return jsonify({'error': 'Batch rejected', 'errors': errors}), 400
+        
+        for product_id, quantity in planned.items():
+            set_cart_quantity(user_id, product_id, quantity)
+        
+        summary = cart_summary(user_id)
+    
+    return jsonify(dict(summary, message='Cart updated', applied=len(operations)))
+
+# 18. Batch Product Updates (Admin)
+@app.route('/api/products/batch', methods=['POST'])
+def batch_update_products():
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    updates = data.get('updates')
+    if not isinstance(updates, list) or not updates:
+        return jsonify({'error': 'Updates required'}), 400
+    if len(updates) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} updates per batch'}), 400
+    
+    planned, errors = plan_product_batch(updates)
+    if errors:
+        return jsonify({'error': 'Batch rejected', 'errors': errors}), 400
+    
+    # Products deleted since planning are skipped and reported
+    updated = []
+    not_found = []
+    for product, fields in planned:
+        if apply_product_updates(product, fields):
+            updated.append(product)
+        else:
+            not_found.append(product['id'])
+    
+    return jsonify({
+        'message': 'Products updated successfully',
+        'updated': len(updated),
+        'products': updated,
+        'not_found': not_found
+    })
+
+# 19. Frequently Bought Together
+@app.route('/api/products/<product_id>/also-bought', methods=['GET'])
+def get_also_bought(product_id):
+    if product_id not in products:
+        return jsonify({'error': 'Product not found'}), 404
+    
+    limit = request.args.get('limit', 10, type=int)
+    if not 1 <= limit <= ALSO_BOUGHT_SIZE:
+        return jsonify({'error': f'Limit must be between 1 and {ALSO_BOUGHT_SIZE}'}), 400
+    
+    with co_purchase_lock:
+        top = list(also_bought.get(product_id, ()))
+    
+    # Deleted products stay in the counts but are not returned
+    related = []
+    for negative_count, other_id in top:
+        if other_id in products:
+            related.append({'product': products[other_id], 'times_bought_together': -negative_count})
+            if len(related) == limit:
+                break
+    
+    return jsonify({
+        'product_id': product_id,
+        'also_bought': related
+    })
+
+# 20. Rebuild Frequently Bought Together (Admin)
+@app.route('/api/products/also-bought/rebuild', methods=['POST'])
+def rebuild_also_bought():
+    # An NDJSON order log body (Content-Type application/x-ndjson) replaces
+    # the counts; otherwise they are recomputed from the stored orders
+    errors = []
+    if request.mimetype == 'application/x-ndjson':
+        processed = rebuild_co_purchases(iter_order_log(iter_stream_lines(request.stream), errors))
+    else:
+        # Order placement waits, so no order is missed or counted twice
+        with analytics_lock:
+            processed = rebuild_co_purchases(list(orders.values()))
+    
+    return jsonify({
+        'message': 'Frequently bought together lists rebuilt',
+        'orders': processed,
+        'products': len(also_bought),
+        'skipped_lines': errors[:100],
+        'skipped': len(errors)
+    })
+
+# 21. Order Analytics
+@app.route('/api/analytics/orders', methods=['GET'])
+def get_order_analytics():
+    group_by = request.args.get('group_by', 'day')
+    category = request.args.get('category')
+    status = request.args.get('status')
+    if group_by not in ANALYTICS_GROUPS:
+        return jsonify({'error': 'Group by must be day, category or status'}), 400
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.date.fromisoformat(start).isoformat() if start else None
+        end = datetime.date.fromisoformat(end).isoformat() if end else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    
+    # Category grouping or filtering reads the per-category cells
+    by_category = group_by == 'category' or category is not None
+    buckets = {}
+    with analytics_lock:
+        # Only the days in range are visited
+        low = bisect.bisect_left(rollup_days, start) if start else 0
+        high = bisect.bisect_right(rollup_days, end) if end else len(rollup_days)
+        for day in rollup_days[low:high]:
+            if by_category:
+                cells = order_rollups[day]['categories'].items()
+            else:
+                cells = (((None, cell_status), cell)
+                         for cell_status, cell in order_rollups[day]['orders'].items())
+            
+            for (cell_category, cell_status), cell in cells:
+                if category is not None and cell_category != category:
+                    continue
+                if status is not None and cell_status != status:
+                    continue
+                if cell['orders']:
+                    key = {'day': day, 'category': cell_category, 'status': cell_status}[group_by]
+                    add_to_cell(buckets, key, cell['revenue'], cell['units'], cell['orders'])
+    
+    # An order with several categories shows up in each of their buckets, so
+    # category buckets are not summed into totals
+    totals = None
+    if group_by != 'category':
+        totals = {
+            'revenue': round(sum(cell['revenue'] for cell in buckets.values()), 2),
+            'units': sum(cell['units'] for cell in buckets.values()),
+            'orders': sum(cell['orders'] for cell in buckets.values())
+        }
+    
+    return jsonify({
+        'group_by': group_by,
+        'start': start,
+        'end': end,
+        'buckets': [{group_by: key, 'revenue': round(cell['revenue'], 2),
+                     'units': cell['units'], 'orders': cell['orders']}
+                    for key, cell in sorted(buckets.items())],
+        'totals': totals
+    })
+
+# 22. Rebuild Order Analytics (Admin)
+@app.route('/api/analytics/orders/rebuild', methods=['POST'])
+def rebuild_order_analytics():
+    # Backfill: recompute every rollup from the stored orders
+    rebuild_order_rollups(orders.values())
     
     return jsonify({
-        'total_products': total_products,
-        'total_stock': total_stock,
-        'low_stock_items': low_stock,
-        'category_stats': category_stats
+        'message': 'Order analytics rebuilt',
+        'orders': len(orders),
+        'days': len(rollup_days)
     })
 
 if __name__ == '__main__':
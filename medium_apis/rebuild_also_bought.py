@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Offline rebuild of the E-commerce API "frequently bought together" lists
+from an order log with one JSON order per line.
+
+With --url the log is streamed to a running API's
+POST /api/products/also-bought/rebuild endpoint, which replaces its lists.
+Otherwise the lists are computed locally and written as JSON.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+
+import ecommerce_api
+
+def upload_log(url, path):
+    """Stream the order log to a running API and return its JSON response"""
+    with open(path, 'rb') as log:
+        request = urllib.request.Request(
+            url.rstrip('/') + '/api/products/also-bought/rebuild', data=log, method='POST',
+            headers={'Content-Type': 'application/x-ndjson',
+                     'Content-Length': str(os.path.getsize(path))})
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+
+def main():
+    """Stream the order log once and load or write each product's top neighbors"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('order_log', nargs='?', default='-',
+                        help='NDJSON order log, or - for stdin')
+    parser.add_argument('--url', help='base URL of a running E-commerce API to load the lists into')
+    parser.add_argument('--output', default='-', help='JSON output file, or - for stdout')
+    parser.add_argument('--top', type=int, default=ecommerce_api.ALSO_BOUGHT_SIZE,
+                        help='neighbors kept per product (local rebuilds only)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.url:
+        if args.order_log == '-':
+            parser.error('--url needs an order log file')
+        result = upload_log(args.url, args.order_log)
+        print(f"{result['orders']} orders, {result['products']} products, "
+              f"{result['skipped']} skipped lines in {time.perf_counter() - start:.1f}s",
+              file=sys.stderr)
+        return
+
+    ecommerce_api.ALSO_BOUGHT_SIZE = args.top
+    errors = []
+    log = sys.stdin if args.order_log == '-' else open(args.order_log)
+    try:
+        processed = ecommerce_api.rebuild_co_purchases(ecommerce_api.iter_order_log(log, errors))
+    finally:
+        if log is not sys.stdin:
+            log.close()
+
+    also_bought = {
+        product_id: [{'product_id': other_id, 'times_bought_together': -negative_count}
+                     for negative_count, other_id in top]
+        for product_id, top in ecommerce_api.also_bought.items()
+    }
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        json.dump(also_bought, output)
+        output.write('\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f'{processed} orders, {len(also_bought)} products, {len(errors)} skipped lines '
+          f'in {time.perf_counter() - start:.1f}s', file=sys.stderr)
+    if errors:
+        print(f'first skipped lines: {errors[:10]}', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
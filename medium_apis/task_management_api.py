@@ -1,6 +1,9 @@
 from flask import Flask, request, jsonify
 import uuid
 import datetime
+import bisect
+import base64
+import json
 from functools import wraps
 
 app = Flask(__name__)
@@ -12,9 +15,175 @@ users = {}
 assignments = {}
 task_comments = {}
 
+# Secondary indexes: field -> value -> set of task ids
+task_index = {
+    'project_id': {},
+    'assigned_to': {},
+    'status': {},
+    'priority': {}
+}
+# (created_at, task_id) ascending, the order task listings are paged in
+tasks_by_time = []
+# Filtered sets smaller than 1/TIME_SCAN_RATIO of all tasks are sorted
+# directly instead of walking tasks_by_time
+TIME_SCAN_RATIO = 8
+MAX_TASK_PAGE = 200
+
+# Per-project rollups, updated by every task mutation so progress reads are O(1)
+project_stats = {}          # project_id -> counters, see new_project_stats
+project_tasks_by_time = {}  # project_id -> (created_at, task_id) ascending
+
 def generate_id():
     return str(uuid.uuid4())
 
+def new_project_stats():
+    return {
+        'total_tasks': 0,
+        'status_counts': {},
+        'priority_counts': {},
+        'estimated_hours': 0,
+        'actual_hours': 0
+    }
+
+def count_project_task(task, sign):
+    stats = project_stats.setdefault(task['project_id'], new_project_stats())
+    stats['total_tasks'] += sign
+    for field, counts in (('status', stats['status_counts']), ('priority', stats['priority_counts'])):
+        counts[task[field]] = counts.get(task[field], 0) + sign
+        if not counts[task[field]]:
+            del counts[task[field]]
+    stats['estimated_hours'] += sign * task['estimated_hours']
+    stats['actual_hours'] += sign * task['actual_hours']
+
+def index_task(task):
+    for field in task_index:
+        if task[field] is not None:
+            task_index[field].setdefault(task[field], set()).add(task['id'])
+    count_project_task(task, 1)
+
+def unindex_task(task):
+    for field in task_index:
+        ids = task_index[field].get(task[field])
+        if ids is None:
+            continue
+        ids.discard(task['id'])
+        if not ids:
+            del task_index[field][task[field]]
+    count_project_task(task, -1)
+
+def remove_time_key(keys, key):
+    position = bisect.bisect_left(keys, key)
+    if position < len(keys) and keys[position] == key:
+        del keys[position]
+
+def store_task(task):
+    tasks[task['id']] = task
+    index_task(task)
+    key = (task['created_at'], task['id'])
+    bisect.insort(tasks_by_time, key)
+    bisect.insort(project_tasks_by_time.setdefault(task['project_id'], []), key)
+
+def remove_task(task_id):
+    task = tasks.pop(task_id)
+    unindex_task(task)
+    key = (task['created_at'], task_id)
+    remove_time_key(tasks_by_time, key)
+    remove_time_key(project_tasks_by_time[task['project_id']], key)
+    return task
+
+def task_fields_error(data):
+    # Indexed fields must be usable as index keys
+    for field in ('status', 'priority'):
+        if field in data and not isinstance(data[field], str):
+            return f'{field} must be a string'
+    if data.get('assigned_to') is not None and not isinstance(data['assigned_to'], str):
+        return 'assigned_to must be a string or null'
+    return None
+
+def hours_error(data):
+    # The project hour rollups need numeric hours
+    for field in ('estimated_hours', 'actual_hours'):
+        value = data.get(field, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f'{field} must be a number'
+    return None
+
+def project_progress(project_id):
+    stats = project_stats.get(project_id) or new_project_stats()
+    total_tasks = stats['total_tasks']
+    completed_tasks = stats['status_counts'].get('completed', 0)
+    return {
+        'total_tasks': total_tasks,
+        'completed_tasks': completed_tasks,
+        'progress': round(completed_tasks / total_tasks * 100, 2) if total_tasks > 0 else 0,
+        'status_breakdown': dict(stats['status_counts']),
+        'priority_breakdown': dict(stats['priority_counts']),
+        'hours': {
+            'estimated': stats['estimated_hours'],
+            'actual': stats['actual_hours'],
+            'variance': stats['actual_hours'] - stats['estimated_hours']
+        }
+    }
+
+def project_task_page(project_id, limit, after=None):
+    # One page of the project's tasks in creation order, and the next cursor
+    keys = project_tasks_by_time.get(project_id, [])
+    start = bisect.bisect_right(keys, tuple(after)) if after else 0
+    page_keys = keys[start:start + limit]
+    next_cursor = None
+    if start + limit < len(keys) and page_keys:
+        next_cursor = encode_cursor(list(page_keys[-1]))
+    return [tasks[task_id] for _, task_id in page_keys], next_cursor
+
+def find_task_ids(**filters):
+    # Intersect the matching id sets, smallest first. A single filter returns
+    # the index set itself, so callers must not modify the result.
+    id_sets = []
+    for field, value in filters.items():
+        if value is None:
+            continue
+        id_sets.append(task_index[field].get(value, set()))
+    if not id_sets:
+        return tasks.keys()
+    id_sets.sort(key=len)
+    if len(id_sets) == 1:
+        return id_sets[0]
+    result = id_sets[0] & id_sets[1]
+    for ids in id_sets[2:]:
+        if not result:
+            break
+        result &= ids
+    return result
+
+def iter_tasks_oldest_first(task_ids, after=None):
+    # Yields tasks in task_ids oldest first, starting strictly after the
+    # (created_at, task_id) keyset bound `after` when given
+    if len(task_ids) * TIME_SCAN_RATIO < len(tasks_by_time):
+        keys = sorted((tasks[task_id]['created_at'], task_id) for task_id in task_ids)
+    else:
+        keys = tasks_by_time
+    start = bisect.bisect_right(keys, tuple(after)) if after else 0
+    for position in range(start, len(keys)):
+        task_id = keys[position][1]
+        if task_id in task_ids:
+            yield tasks[task_id]
+
+def encode_cursor(value):
+    raw = json.dumps(value, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    # Returns the (created_at, task_id) bound, or None for malformed cursors
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if (isinstance(value, list) and len(value) == 2 and
+            all(isinstance(part, str) for part in value)):
+        return value
+    return None
+
 # Sample data
 sample_users = [
     {'id': 'user1', 'name': 'John Doe', 'email': 'john@example.com'},
@@ -87,7 +256,7 @@ sample_tasks = [
 ]
 
 for task in sample_tasks:
-    tasks[task['id']] = task
+    store_task(task)
 
 # 1. Get All Projects
 @app.route('/api/projects', methods=['GET'])
@@ -117,21 +286,31 @@ def get_project(project_id):
     if not project:
         return jsonify({'error': 'Project not found'}), 404
     
-    # Get project tasks
-    project_tasks = [task for task in tasks.values() if task['project_id'] == project_id]
+    include_tasks = request.args.get('include_tasks', 'true').lower() != 'false'
+    limit = request.args.get('limit', 50, type=int)
+    cursor = request.args.get('cursor')
+    if not 1 <= limit <= MAX_TASK_PAGE:
+        return jsonify({'error': f'Limit must be between 1 and {MAX_TASK_PAGE}'}), 400
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    # Progress comes from the project's counters
+    progress = project_progress(project_id)
+    response = {
+        'project': project,
+        'progress': progress['progress'],
+        'total_tasks': progress['total_tasks'],
+        'completed_tasks': progress['completed_tasks']
+    }
     
-    # Calculate progress
-    total_tasks = len(project_tasks)
-    completed_tasks = len([task for task in project_tasks if task['status'] == 'completed'])
-    progress = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    # Get a page of project tasks
+    if include_tasks:
+        response['tasks'], response['next_cursor'] = project_task_page(project_id, limit, after)
     
-    return jsonify({
-        'project': project,
-        'tasks': project_tasks,
-        'progress': round(progress, 2),
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks
-    })
+    return jsonify(response)
 
 # 3. Create Project
 @app.route('/api/projects', methods=['POST'])
@@ -199,10 +378,10 @@ def delete_project(project_id):
         return jsonify({'error': 'Project not found'}), 404
     
     # Delete associated tasks
-    tasks_to_delete = [task_id for task_id, task in tasks.items() 
-                      if task['project_id'] == project_id]
-    for task_id in tasks_to_delete:
-        del tasks[task_id]
+    for task_id in list(find_task_ids(project_id=project_id)):
+        remove_task(task_id)
+    project_stats.pop(project_id, None)
+    project_tasks_by_time.pop(project_id, None)
     
     del projects[project_id]
     return jsonify({'message': 'Project deleted successfully'})
@@ -214,22 +393,39 @@ def get_tasks():
     assigned_to = request.args.get('assigned_to')
     status = request.args.get('status')
     priority = request.args.get('priority')
+    limit = request.args.get('limit', 50, type=int)
+    cursor = request.args.get('cursor')
+    
+    if not 1 <= limit <= MAX_TASK_PAGE:
+        return jsonify({'error': f'Limit must be between 1 and {MAX_TASK_PAGE}'}), 400
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    task_ids = find_task_ids(project_id=project_id or None, assigned_to=assigned_to or None,
+                             status=status or None, priority=priority or None)
+    
+    # Keyset pagination in creation order
+    ordered_tasks = iter_tasks_oldest_first(task_ids, after)
+    page_tasks = []
+    for task in ordered_tasks:
+        page_tasks.append(task)
+        if len(page_tasks) == limit:
+            break
+    
+    next_cursor = None
+    if len(page_tasks) == limit and next(ordered_tasks, None) is not None:
+        last = page_tasks[-1]
+        next_cursor = encode_cursor([last['created_at'], last['id']])
     
-    filtered_tasks = []
-    
-    for task in tasks.values():
-        if project_id and task['project_id'] != project_id:
-            continue
-        if assigned_to and task['assigned_to'] != assigned_to:
-            continue
-        if status and task['status'] != status:
-            continue
-        if priority and task['priority'] != priority:
-            continue
-        
-        filtered_tasks.append(task)
-    
-    return jsonify({'tasks': filtered_tasks})
+    return jsonify({
+        'tasks': page_tasks,
+        'total': len(task_ids),
+        'limit': limit,
+        'next_cursor': next_cursor
+    })
 
 # 7. Get Single Task
 @app.route('/api/tasks/<task_id>', methods=['GET'])
@@ -259,9 +455,13 @@ def create_task():
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
-    if data['project_id'] not in projects:
+    if not isinstance(data['project_id'], str) or data['project_id'] not in projects:
         return jsonify({'error': 'Invalid project ID'}), 400
     
+    error = task_fields_error(data) or hours_error(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
     task_id = generate_id()
     task = {
         'id': task_id,
@@ -278,7 +478,7 @@ def create_task():
         'actual_hours': data.get('actual_hours', 0)
     }
     
-    tasks[task_id] = task
+    store_task(task)
     
     return jsonify({
         'message': 'Task created successfully',
@@ -296,11 +496,18 @@ def update_task(task_id):
     if not task:
         return jsonify({'error': 'Task not found'}), 404
     
-    # Update fields
+    # Validate before the task leaves the indexes
+    error = task_fields_error(data) or hours_error(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    # Update fields, re-indexing the task around the change
+    unindex_task(task)
     for field in ['title', 'description', 'assigned_to', 'status', 'priority', 
                   'due_date', 'estimated_hours', 'actual_hours']:
         if field in data:
             task[field] = data[field]
+    index_task(task)
     
     task['updated_at'] = datetime.datetime.now().isoformat()
     
@@ -321,7 +528,7 @@ def delete_task(task_id):
     for comment_id in comments_to_delete:
         del task_comments[comment_id]
     
-    del tasks[task_id]
+    remove_task(task_id)
     return jsonify({'message': 'Task deleted successfully'})
 
 # 11. Add Comment to Task
@@ -363,14 +570,15 @@ def get_user_dashboard(user_id):
         return jsonify({'error': 'User not found'}), 404
     
     # Get user's tasks
-    user_tasks = [task for task in tasks.values() if task['assigned_to'] == user_id]
+    user_task_ids = find_task_ids(assigned_to=user_id)
+    user_tasks = list(iter_tasks_oldest_first(user_task_ids))
     
     # Get user's projects
     user_projects = [project for project in projects.values() if project['owner_id'] == user_id]
     
     # Calculate stats
     total_tasks = len(user_tasks)
-    completed_tasks = len([task for task in user_tasks if task['status'] == 'completed'])
+    completed_tasks = len(find_task_ids(assigned_to=user_id, status='completed'))
     overdue_tasks = len([task for task in user_tasks 
                         if task['due_date'] and task['status'] != 'completed' and 
                         task['due_date'] < datetime.datetime.now().strftime('%Y-%m-%d')])
@@ -394,29 +602,14 @@ def get_project_progress(project_id):
     if not project:
         return jsonify({'error': 'Project not found'}), 404
     
-    project_tasks = [task for task in tasks.values() if task['project_id'] == project_id]
-    
-    status_counts = {}
-    priority_counts = {}
-    total_estimated = 0
-    total_actual = 0
-    
-    for task in project_tasks:
-        status_counts[task['status']] = status_counts.get(task['status'], 0) + 1
-        priority_counts[task['priority']] = priority_counts.get(task['priority'], 0) + 1
-        total_estimated += task['estimated_hours']
-        total_actual += task['actual_hours']
+    progress = project_progress(project_id)
     
     return jsonify({
         'project': project,
-        'total_tasks': len(project_tasks),
-        'status_breakdown': status_counts,
-        'priority_breakdown': priority_counts,
-        'hours': {
-            'estimated': total_estimated,
-            'actual': total_actual,
-            'variance': total_actual - total_estimated
-        }
+        'total_tasks': progress['total_tasks'],
+        'status_breakdown': progress['status_breakdown'],
+        'priority_breakdown': progress['priority_breakdown'],
+        'hours': progress['hours']
     })
 
 # 14. Get All Users